@@ -0,0 +1,194 @@
+import argparse
+import datetime
+import itertools
+import json
+import math
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import backtesting
+
+# --- AJUSTE DE HIPERPARÂMETROS DO PROPHET (POR GÁS E REGIÃO) ---
+# NO2, CH4, CO e SO2 têm dinâmicas muito diferentes, mas o app usa sempre
+# Prophet(daily_seasonality=False, weekly_seasonality=True). Este job procura
+# (grade ou amostragem aleatória) os priors de changepoint/sazonalidade, avalia
+# cada candidato nos folds do backtesting em paralelo e para cedo os ruins
+# (successive halving: poucos cortes primeiro, mais cortes só para os melhores).
+# O melhor conjunto vai para um JSON por gás e "bucket" de região; o caminho
+# online (run_forecast) só consulta esse arquivo.
+#
+# Exemplo:
+#   python ajuste_hiperparametros.py sites.csv --modo aleatorio --amostras 20
+#   python ajuste_hiperparametros.py sites.csv --fake
+
+ARQUIVO_PARAMETROS = os.environ.get('CARBONCAST_PARAMETROS', 'parametros_prophet.json')
+GRAUS_BUCKET = 5  # regiões de 5° x 5° (~550 km)
+
+ESPACO_BUSCA = {
+    'changepoint_prior_scale': [0.001, 0.01, 0.05, 0.1, 0.5],
+    'seasonality_prior_scale': [0.01, 0.1, 1.0, 10.0],
+    'seasonality_mode': ['additive', 'multiplicative'],
+    'weekly_seasonality': [True, False],
+}
+
+
+# --- 1. ARMAZÉM DE PARÂMETROS (LEITURA NO CAMINHO ONLINE) ---
+_lock = threading.Lock()
+_memoria = {'mtime': None, 'dados': {}}
+
+
+def bucket_regiao(lat, lon, graus=GRAUS_BUCKET):
+    return f"lat{math.floor(lat / graus) * graus}_lon{math.floor(lon / graus) * graus}"
+
+
+def _ler_armazem(caminho=None):
+    caminho = caminho or ARQUIVO_PARAMETROS
+    try:
+        mtime = os.path.getmtime(caminho)
+    except OSError:
+        return {}
+    with _lock:
+        if _memoria['mtime'] != mtime:
+            with open(caminho, encoding='utf-8') as f:
+                _memoria['dados'] = json.load(f)
+            _memoria['mtime'] = mtime
+        return _memoria['dados']
+
+
+def parametros_para(gas, lat=None, lon=None, caminho=None):
+    """Melhores parâmetros salvos para o gás/região; cai para o padrão do gás, ou {}."""
+    por_gas = _ler_armazem(caminho).get(gas, {})
+    entrada = None
+    if lat is not None and lon is not None:
+        entrada = por_gas.get(bucket_regiao(lat, lon))
+    entrada = entrada or por_gas.get('_padrao')
+    return dict(entrada['parametros']) if entrada else {}
+
+
+def salvar_parametros(gas, bucket, parametros, escore, caminho=None):
+    caminho = caminho or ARQUIVO_PARAMETROS
+    with _lock:
+        dados = {}
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as f:
+                dados = json.load(f)
+        dados.setdefault(gas, {})[bucket] = {
+            'parametros': parametros,
+            'escore': escore,
+            'atualizado': datetime.datetime.now().isoformat(timespec='seconds'),
+        }
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, caminho)
+
+
+# --- 2. CANDIDATOS ---
+def gerar_candidatos(modo='grade', amostras=20, semente=42, espaco=ESPACO_BUSCA):
+    nomes = list(espaco)
+    todos = [dict(zip(nomes, valores)) for valores in itertools.product(*(espaco[n] for n in nomes))]
+    if modo == 'aleatorio' and amostras < len(todos):
+        return random.Random(semente).sample(todos, amostras)
+    return todos
+
+
+# --- 3. AVALIAÇÃO COM PARADA ANTECIPADA ---
+def _escore(resultados):
+    """MAE normalizado pelo desvio de cada site (comparável entre sites do mesmo bucket)."""
+    r = resultados.dropna(subset=['yhat'])
+    if r.empty:
+        return math.inf
+    por_site = (r.assign(_erro=(r['y'] - r['yhat']).abs())
+                .groupby('site').agg(mae=('_erro', 'mean'), desvio=('y', 'std')))
+    desvio = por_site['desvio'].fillna(0).replace(0, 1.0)
+    return float((por_site['mae'] / desvio).mean())
+
+
+def ajustar_grupo(series, candidatos, horizonte_dias=90, periodo_dias=90, treino_min_dias=365,
+                  eta=3, executor=None):
+    """
+    series: {(site, gas): DataFrame(ds, y)} de um mesmo gás/bucket.
+    Successive halving: a cada rodada usa mais cortes (os mais recentes primeiro)
+    e mantém só o melhor 1/eta dos candidatos.
+    """
+    cortes = {chave: backtesting.gerar_cortes(df, horizonte_dias, periodo_dias, treino_min_dias)[::-1]
+              for chave, df in series.items()}
+    max_cortes = max((len(c) for c in cortes.values()), default=0)
+    if max_cortes == 0:
+        return None, math.inf, []
+
+    vivos = list(range(len(candidatos)))
+    n_cortes = 1
+    historico = []
+    while True:
+        tarefas, donos = [], []
+        for i in vivos:
+            for (site, gas), df in series.items():
+                for corte in cortes[(site, gas)][:n_cortes]:
+                    tarefas.append(backtesting.preparar_fold(site, gas, 'prophet', corte, horizonte_dias, df,
+                                                             candidatos[i]))
+                    donos.append(i)
+        # Os folds já calculados em rodadas anteriores saem do cache do backtesting
+        partes = backtesting.rodar_folds(tarefas, executor)
+        escores = {}
+        for i in vivos:
+            minhas = [p for p, dono in zip(partes, donos) if dono == i]
+            escores[i] = _escore(pd.concat(minhas, ignore_index=True)) if minhas else math.inf
+        historico.append({'cortes': n_cortes, 'escores': {i: escores[i] for i in vivos}})
+
+        vivos = sorted(vivos, key=lambda i: escores[i])
+        if len(vivos) == 1 or n_cortes >= max_cortes:
+            melhor = vivos[0]
+            return candidatos[melhor], escores[melhor], historico
+        vivos = vivos[:max(1, len(vivos) // eta)]
+        n_cortes = min(n_cortes * eta, max_cortes)
+
+
+def ajustar(sites, fonte=None, modo='grade', amostras=20, max_workers=None, caminho=None, **kwargs):
+    """Ajusta e salva os parâmetros de cada (gás, bucket) e o padrão de cada gás."""
+    sites = sites.assign(bucket=[bucket_regiao(la, lo) for la, lo in zip(sites['lat'], sites['lon'])])
+    series = backtesting.carregar_series(sites, fonte)
+    candidatos = gerar_candidatos(modo, amostras)
+    resumo = []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        grupos = [(gas, bucket, grupo) for (gas, bucket), grupo in sites.groupby(['gas', 'bucket'])]
+        grupos += [(gas, '_padrao', grupo) for gas, grupo in sites.groupby('gas')]
+        for gas, bucket, grupo in grupos:
+            do_grupo = {(s, gas): series[(s, gas)] for s in grupo['site']
+                        if series.get((s, gas)) is not None and not series[(s, gas)].empty}
+            print(f"🔧 {gas} / {bucket}: {len(candidatos)} candidatos, {len(do_grupo)} sites...")
+            melhor, escore, _ = ajustar_grupo(do_grupo, candidatos, executor=executor, **kwargs)
+            if melhor is None:
+                print("   ⚠️ Histórico insuficiente para o backtest.")
+                continue
+            salvar_parametros(gas, bucket, melhor, escore, caminho)
+            resumo.append({'gas': gas, 'bucket': bucket, 'escore': escore, **melhor})
+            print(f"   ✅ escore={escore:.4f} {melhor}")
+    return pd.DataFrame(resumo)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ajuste de hiperparâmetros do Prophet por gás e região")
+    parser.add_argument('sites', help="CSV com colunas site,gas,lat,lon")
+    parser.add_argument('--modo', choices=['grade', 'aleatorio'], default='grade')
+    parser.add_argument('--amostras', type=int, default=20, help="candidatos no modo aleatório")
+    parser.add_argument('--horizonte', type=int, default=90)
+    parser.add_argument('--periodo', type=int, default=90)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fake', action='store_true', help="usa a fonte sintética (sem Earth Engine)")
+    args = parser.parse_args()
+
+    fonte = None
+    if args.fake:
+        from api_servico import FonteFake
+        fonte = FonteFake()
+
+    resumo = ajustar(pd.read_csv(args.sites), fonte, args.modo, args.amostras, args.workers,
+                     horizonte_dias=args.horizonte, periodo_dias=args.periodo)
+    print(resumo.to_string(index=False))
+    print(f"💾 Parâmetros salvos em '{ARQUIVO_PARAMETROS}'")
@@ -0,0 +1,319 @@
+import argparse
+import io
+import json
+import math
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+import artefatos
+import cache_espacial
+import cache_memoria
+import dados_satelite
+import exportacao_lote
+import hotspots
+import inicializacao
+
+# --- SERVIÇO HTTP "HEADLESS" ---
+# Expõe a mesma lógica do app (get_data, get_ndvi, run_forecast) em JSON/Parquet
+# para outros sistemas, sem Streamlit. Como no app, sites da watchlist saem dos
+# artefatos do daemon_precomputo (sem Earth Engine nem Prophet ao vivo).
+#
+# Exemplos:
+#   python api_servico.py --porta 8080
+#   python api_servico.py --fake            (fonte sintética, sem Earth Engine)
+#   GET /serie?gas=NO2&lat=-23.55&lon=-46.63
+#   GET /serie?gas=NO2&lat=-23.55&lon=-46.63&interpolar=1
+#   GET /previsao?gas=CH4&lat=-24.72&lon=-47.76&formato=parquet
+#   GET /ndvi?lat=-23.55&lon=-46.63
+#   GET /hotspots?gas=CH4&bbox=-48.5,-25.5,-46.0,-23.0&n=10&inicio=2024-01-01&fim=2024-06-01
+#   GET /exportar?gas=NO2,CH4&formato=zip   (dossiês de todos os sites pré-calculados, em streaming)
+
+
+# --- 1. FONTES DE DADOS ---
+class FonteEarthEngine:
+    """Fonte real: Sentinel-5P e MODIS via Google Earth Engine."""
+
+    def get_data(self, lat, lon, gas_type):
+        return dados_satelite.get_data(lat, lon, gas_type)
+
+    def get_ndvi(self, lat, lon):
+        return dados_satelite.get_ndvi(lat, lon)
+
+
+class FonteFake:
+    """
+    Fonte sintética e determinística (mesma coordenada = mesma série).
+    Serve para testar o serviço localmente sem credenciais do Earth Engine.
+    """
+
+    BASE = {'NO2': 0.0001, 'CH4': 1850.0, 'CO': 0.03, 'SO2': 0.0002}
+
+    def __init__(self, atraso=0.0):
+        self.atraso = atraso
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def _semente(self, *partes):
+        return zlib.crc32(repr(partes).encode())
+
+    def _contar(self):
+        with self._lock:
+            self.chamadas += 1
+        if self.atraso:
+            threading.Event().wait(self.atraso)
+
+    def get_data(self, lat, lon, gas_type):
+        self._contar()
+        chave = dados_satelite.chave_gas(gas_type)
+        if chave is None:
+            return pd.DataFrame(), None
+        rng = np.random.default_rng(self._semente(chave, lat, lon))
+        ds = pd.date_range(dados_satelite.DATA_INICIO, dados_satelite.DATA_FIM, freq='D', inclusive='left')
+        base = self.BASE[chave]
+        sazonal = np.sin(2 * np.pi * ds.dayofyear.to_numpy() / 365.25)
+        y = base * (1 + 0.1 * sazonal + rng.normal(0, 0.05, len(ds)))
+        return pd.DataFrame({'ds': ds, 'y': y}), dados_satelite.GASES[chave]['band']
+
+    def get_ndvi(self, lat, lon):
+        self._contar()
+        rng = np.random.default_rng(self._semente('NDVI', lat, lon))
+        ds = pd.date_range(dados_satelite.DATA_INICIO, dados_satelite.DATA_FIM, freq='16D', inclusive='left')
+        sazonal = np.sin(2 * np.pi * ds.dayofyear.to_numpy() / 365.25)
+        ndvi = np.clip(0.6 + 0.15 * sazonal + rng.normal(0, 0.03, len(ds)), 0, 1)
+        return pd.DataFrame({'ds': ds, 'ndvi': ndvi})
+
+
+# --- 2. SINGLE-FLIGHT (COALESCÊNCIA DE REQUISIÇÕES) ---
+class _Voo:
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class SingleFlight:
+    """
+    Chamadas concorrentes com a mesma chave esperam pela primeira:
+    uma única busca no Earth Engine e um único ajuste do Prophet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._em_voo = {}
+
+    def executar(self, chave, funcao):
+        with self._lock:
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._em_voo[chave] = _Voo()
+
+        if not lider:
+            voo.pronto.wait()
+        else:
+            try:
+                voo.resultado = funcao()
+            except Exception as e:
+                voo.erro = e
+            finally:
+                with self._lock:
+                    del self._em_voo[chave]
+                voo.pronto.set()
+
+        if voo.erro is not None:
+            raise voo.erro
+        return voo.resultado
+
+
+# --- 3. SERVIÇO ---
+class ServicoCarbonCast:
+    def __init__(self, fonte=None, previsor=None, pasta_artefatos=None):
+        self.fonte = fonte or FonteEarthEngine()
+        self.previsor = previsor or dados_satelite.run_forecast
+        self.pasta_artefatos = pasta_artefatos
+        self.voos = SingleFlight()
+        self.indice = cache_espacial.IndiceEspacial()
+
+    def _artefato(self, chave, lat, lon):
+        return artefatos.carregar(chave, lat, lon, max_idade_h=artefatos.MAX_IDADE_H, pasta=self.pasta_artefatos)
+
+    def serie(self, gas_type, lat, lon, interpolar=False):
+        chave = dados_satelite.chave_gas(gas_type)
+        if chave is None:
+            raise ValueError(f"Gás desconhecido: {gas_type}")
+        artefato = self._artefato(chave, lat, lon)
+        if artefato is not None:
+            return artefato['serie'], artefato['meta'].get('band')
+        # A chave do single-flight é a célula da grade, não a coordenada crua
+        linha, coluna = cache_espacial.celula(lat, lon, chave)
+        return self.voos.executar(
+            ('serie', chave, linha, coluna, interpolar),
+            lambda: cache_espacial.get_data(lat, lon, chave, interpolar=interpolar,
+                                            indice=self.indice, buscar=self.fonte.get_data))
+
+    def ndvi(self, lat, lon):
+        linha, coluna = cache_espacial.celula(lat, lon, 'NDVI')
+        return self.voos.executar(
+            ('ndvi', linha, coluna),
+            lambda: cache_espacial.get_ndvi(lat, lon, indice=self.indice, buscar=self.fonte.get_ndvi))
+
+    def previsao(self, gas_type, lat, lon):
+        chave = dados_satelite.chave_gas(gas_type)
+        if chave is None:
+            raise ValueError(f"Gás desconhecido: {gas_type}")
+        artefato = self._artefato(chave, lat, lon)
+        if artefato is not None:
+            return cache_memoria.compactar_previsao(artefato['previsao'])
+        linha, coluna = cache_espacial.celula(lat, lon, chave)
+
+        def _prever():
+            df, _ = self.serie(chave, lat, lon)
+            if df.empty or len(df) < 5:
+                return pd.DataFrame(columns=['ds', 'yhat', 'yhat_lower', 'yhat_upper'])
+            forecast = self.previsor(df, chave, lat, lon)
+            return cache_memoria.compactar_previsao(forecast)
+
+        return self.voos.executar(('previsao', chave, linha, coluna), _prever)
+
+
+# --- 4. SERIALIZAÇÃO ---
+def serializar(df, formato):
+    """Devolve (corpo, content-type) em JSON ou Parquet."""
+    if formato == 'parquet':
+        buffer = io.BytesIO()
+        df.to_parquet(buffer, index=False)
+        return buffer.getvalue(), 'application/vnd.apache.parquet'
+    if formato != 'json':
+        raise ValueError(f"Formato desconhecido: {formato}")
+    saida = df.copy()
+    if 'ds' in saida:
+        saida['ds'] = saida['ds'].dt.strftime('%Y-%m-%d')
+    corpo = saida.to_json(orient='records')
+    return corpo.encode('utf-8'), 'application/json'
+
+
+# --- 5. HTTP ---
+def _parametro(params, nome, tipo=str, padrao=None):
+    valores = params.get(nome)
+    if not valores:
+        if padrao is None:
+            raise ValueError(f"Parâmetro obrigatório ausente: {nome}")
+        return padrao
+    try:
+        valor = tipo(valores[0])
+        if isinstance(valor, float) and not math.isfinite(valor):
+            raise ValueError(valores[0])  # nan/inf passam no float() mas não são coordenadas
+    except ValueError:
+        raise ValueError(f"Parâmetro inválido: {nome}={valores[0]}")
+    return valor
+
+
+def criar_handler(servico):
+    class Handler(BaseHTTPRequestHandler):
+        def _responder(self, status, corpo, tipo='application/json'):
+            self.send_response(status)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def _erro(self, status, mensagem):
+            self._responder(status, json.dumps({'erro': mensagem}).encode('utf-8'))
+
+        def _exportar(self, params):
+            """
+            Resposta sem Content-Length: os bytes saem conforme o gerador produz.
+            Tudo é validado antes do cabeçalho; depois dele, um erro só pode ser registrado
+            e a conexão fechada (o cliente vê o corpo truncado, não um 200 "completo").
+            """
+            formato = _parametro(params, 'formato', padrao='csv.gz')
+            if formato not in ('csv.gz', 'zip'):
+                raise ValueError(f"Formato de exportação desconhecido: {formato} (use csv.gz ou zip)")
+            gases = set()
+            for gas in set(_parametro(params, 'gas', padrao='').split(',')) - {''}:
+                if dados_satelite.chave_gas(gas) is None:
+                    raise ValueError(f"Gás desconhecido: {gas}")
+                gases.add(dados_satelite.chave_gas(gas))
+            sites = list(exportacao_lote.sites_dos_artefatos(gases or None))
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip' if formato == 'zip' else 'application/gzip')
+            self.send_header('Content-Disposition', f'attachment; filename="dossies.{formato}"')
+            self.end_headers()
+            try:
+                if formato == 'zip':
+                    exportacao_lote.escrever_zip(exportacao_lote.dossies(sites), self.wfile)
+                else:
+                    for bloco in exportacao_lote.blocos_csv_gz(exportacao_lote.linhas(sites)):
+                        self.wfile.write(bloco)
+            except Exception as e:
+                self.log_error("Exportação interrompida: %s", e)
+                self.close_connection = True
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            if url.path == '/exportar':
+                try:
+                    return self._exportar(params)
+                except ValueError as e:
+                    return self._erro(400, str(e))
+                except Exception as e:
+                    return self._erro(502, f"Erro de Processamento: {e}")
+            try:
+                formato = _parametro(params, 'formato', padrao='json')
+                if url.path == '/saude':
+                    saude = {'status': 'ok', 'cache': servico.indice.uso()}
+                    return self._responder(200, json.dumps(saude).encode('utf-8'))
+                elif url.path == '/serie':
+                    df, _ = servico.serie(_parametro(params, 'gas'), _parametro(params, 'lat', float),
+                                          _parametro(params, 'lon', float),
+                                          interpolar=_parametro(params, 'interpolar', padrao='0') == '1')
+                elif url.path == '/hotspots':
+                    bbox = [float(c) for c in _parametro(params, 'bbox').split(',')]
+                    if len(bbox) != 4 or not all(math.isfinite(c) for c in bbox):
+                        raise ValueError("bbox deve ter 4 valores: oeste,sul,leste,norte")
+                    df = hotspots.varrer_hotspots(bbox, _parametro(params, 'gas'),
+                                                  _parametro(params, 'inicio', padrao='') or None,
+                                                  _parametro(params, 'fim', padrao='') or None,
+                                                  _parametro(params, 'n', int, padrao=10))
+                elif url.path == '/ndvi':
+                    df = servico.ndvi(_parametro(params, 'lat', float), _parametro(params, 'lon', float))
+                elif url.path == '/previsao':
+                    df = servico.previsao(_parametro(params, 'gas'), _parametro(params, 'lat', float),
+                                          _parametro(params, 'lon', float))
+                else:
+                    return self._erro(404, f"Rota desconhecida: {url.path}")
+                corpo, tipo = serializar(df, formato)
+            except ValueError as e:
+                return self._erro(400, str(e))
+            except inicializacao.EEIndisponivel as e:
+                # Degradado: a espera pelo EE é limitada (TIMEOUT_EE) e o cliente pode tentar de novo
+                return self._erro(503, str(e))
+            except Exception as e:
+                return self._erro(502, f"Erro de Processamento: {e}")
+            self._responder(200, corpo, tipo)
+
+    return Handler
+
+
+def criar_servidor(servico, host='127.0.0.1', porta=8080):
+    return ThreadingHTTPServer((host, porta), criar_handler(servico))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API headless do CarbonCast")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--fake', action='store_true', help="usa a fonte sintética (sem Earth Engine)")
+    args = parser.parse_args()
+
+    servico = ServicoCarbonCast(fonte=FonteFake() if args.fake else FonteEarthEngine())
+    servidor = criar_servidor(servico, args.host, args.porta)
+    print(f"🚀 API CarbonCast em http://{args.host}:{args.porta}")
+    servidor.serve_forever()
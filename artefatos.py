@@ -0,0 +1,118 @@
+import datetime
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+import cache_espacial
+import dados_satelite
+
+# --- ARTEFATOS PRÉ-CALCULADOS ---
+# Série do satélite, NDVI e previsão de cada site da watchlist, gravados pelo
+# daemon_precomputo.py e lidos direto pelo app/API. A chave é a célula da grade
+# do gás, então qualquer clique dentro da célula reaproveita o artefato.
+#
+# Cada gravação vira uma versão própria (pasta oculta '.<chave>.<sufixo>') e o
+# arquivo '<chave>.atual' aponta para a versão vigente; trocar o ponteiro é um
+# único os.replace, então sempre há um artefato completo e gravações
+# simultâneas da mesma chave não disputam nomes. Versões antigas saem depois
+# de TEMPO_VERSAO_ANTIGA segundos (leitores que já abriram a anterior terminam).
+
+PASTA_ARTEFATOS = os.environ.get('CARBONCAST_ARTEFATOS', 'artefatos')
+COLUNAS_PREVISAO = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+# O daemon roda uma vez por dia (03:00); 36 h toleram uma rodada atrasada sem servir dado de dois dias
+MAX_IDADE_H = float(os.environ.get('CARBONCAST_ARTEFATOS_MAX_H', '36'))
+TEMPO_VERSAO_ANTIGA = 600
+
+
+def chave_artefato(gas_type, lat, lon):
+    chave = dados_satelite.chave_gas(gas_type)
+    linha, coluna = cache_espacial.celula(lat, lon, chave)
+    return f"{chave}_{linha}_{coluna}"
+
+
+def _versao_atual(pasta, chave):
+    """Pasta da versão vigente da chave (sem ponteiro, a pasta '<chave>' do layout antigo)."""
+    try:
+        with open(os.path.join(pasta, chave + '.atual'), encoding='utf-8') as f:
+            return os.path.join(pasta, f.read().strip())
+    except FileNotFoundError:
+        return os.path.join(pasta, chave)
+
+
+def _limpar_versoes(pasta, chave, atual):
+    prefixo = f'.{chave}.'
+    for nome in os.listdir(pasta):
+        caminho = os.path.join(pasta, nome)
+        if not nome.startswith(prefixo) or nome == atual:
+            continue
+        try:
+            if time.time() - os.path.getmtime(caminho) > TEMPO_VERSAO_ANTIGA:
+                shutil.rmtree(caminho, ignore_errors=True)
+        except FileNotFoundError:
+            pass  # outro gravador já removeu
+
+
+def salvar(gas_type, lat, lon, serie, ndvi, previsao, meta=None, pasta=None):
+    """Grava uma versão nova dos artefatos e troca o ponteiro de uma vez (leitores nunca veem meio arquivo)."""
+    pasta = pasta or PASTA_ARTEFATOS
+    chave = chave_artefato(gas_type, lat, lon)
+    os.makedirs(pasta, exist_ok=True)
+
+    versao = tempfile.mkdtemp(dir=pasta, prefix=f'.{chave}.')
+    serie.to_parquet(os.path.join(versao, 'serie.parquet'), index=False)
+    ndvi.to_parquet(os.path.join(versao, 'ndvi.parquet'), index=False)
+    previsao[COLUNAS_PREVISAO].to_parquet(os.path.join(versao, 'previsao.parquet'), index=False)
+    meta = dict(meta or {})
+    meta.update({'gas': dados_satelite.chave_gas(gas_type), 'lat': lat, 'lon': lon,
+                 'atualizado': datetime.datetime.now().isoformat(timespec='seconds')})
+    with open(os.path.join(versao, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    descritor, temporario = tempfile.mkstemp(dir=pasta, prefix='.tmp_')
+    with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(versao))
+    os.replace(temporario, os.path.join(pasta, chave + '.atual'))
+
+    _limpar_versoes(pasta, chave, os.path.basename(versao))
+    shutil.rmtree(os.path.join(pasta, chave), ignore_errors=True)  # layout antigo, se houver
+    return versao
+
+
+def carregar(gas_type, lat, lon, max_idade_h=None, pasta=None):
+    """Devolve {'serie', 'ndvi', 'previsao', 'meta'} ou None se não houver artefato (ou estiver velho)."""
+    if dados_satelite.chave_gas(gas_type) is None:
+        return None
+    origem = _versao_atual(pasta or PASTA_ARTEFATOS, chave_artefato(gas_type, lat, lon))
+    try:
+        with open(os.path.join(origem, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+        if max_idade_h is not None:
+            idade = datetime.datetime.now() - datetime.datetime.fromisoformat(meta['atualizado'])
+            if idade > datetime.timedelta(hours=max_idade_h):
+                return None
+        return {
+            'serie': pd.read_parquet(os.path.join(origem, 'serie.parquet')),
+            'ndvi': pd.read_parquet(os.path.join(origem, 'ndvi.parquet')),
+            'previsao': pd.read_parquet(os.path.join(origem, 'previsao.parquet')),
+            'meta': meta,
+        }
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+
+def listar(pasta=None):
+    """Metadados de todos os artefatos gravados (um por célula/gás)."""
+    pasta = pasta or PASTA_ARTEFATOS
+    if not os.path.isdir(pasta):
+        return
+    chaves = {nome.removesuffix('.atual') for nome in os.listdir(pasta) if not nome.startswith('.')}
+    for chave in sorted(chaves):
+        try:
+            with open(os.path.join(_versao_atual(pasta, chave), 'meta.json'), encoding='utf-8') as f:
+                yield json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
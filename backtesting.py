@@ -0,0 +1,244 @@
+import argparse
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import dados_satelite
+
+# --- BACKTESTING (ROLLING ORIGIN) ---
+# Mede a precisão real do run_forecast (app) e do gerar_previsao (previsao_ia)
+# por gás e região: para cada site e cada data de corte, treina só com o
+# passado, prevê o horizonte seguinte e compara com o que o satélite mediu.
+# Os folds rodam num pool de processos e as previsões de cada fold ficam em
+# cache no disco, então rodar de novo só calcula cortes novos.
+#
+# Exemplo:
+#   python backtesting.py sites.csv --motores prophet_app,ingenuo_sazonal
+#   python backtesting.py sites.csv --fake        (fonte sintética, sem Earth Engine)
+# sites.csv: colunas site,gas,lat,lon
+
+PASTA_CACHE = os.environ.get('CARBONCAST_CACHE_BACKTEST', 'cache_backtest')
+
+
+# --- 1. MOTORES DE PREVISÃO ---
+# Todos recebem o histórico de treino (ds, y), as datas a prever e parâmetros
+# opcionais, e devolvem (DataFrame[ds, yhat, yhat_lower, yhat_upper], modelo ou None).
+
+def motor_prophet(treino, datas, **parametros):
+    """Prophet com os padrões do app, sobrescritos por `parametros` (usado no ajuste)."""
+    from prophet import Prophet
+
+    modelo = Prophet(**{**dados_satelite.PROPHET_PADRAO, **parametros})
+    modelo.fit(treino)
+    previsao = modelo.predict(pd.DataFrame({'ds': datas}))
+    return previsao[['ds', 'yhat', 'yhat_lower', 'yhat_upper']], modelo
+
+
+def motor_prophet_app(treino, datas, **parametros):
+    """Mesmo modelo do app: recebe dados_satelite.opcoes_prophet do gás/região (ver CONFIGURACOES)."""
+    return motor_prophet(treino, datas, **parametros)
+
+
+def motor_prophet_ia(treino, datas, **parametros):
+    """Mesmo modelo do previsao_ia.gerar_previsao (ver CONFIGURACOES)."""
+    return motor_prophet(treino, datas, **parametros)
+
+
+def motor_ingenuo_sazonal(treino, datas, **_):
+    """Referência barata: média da mesma semana do ano no histórico, ±1,28 desvio (80%)."""
+    semana = treino['ds'].dt.isocalendar().week.astype(int)
+    por_semana = treino.groupby(semana)['y'].mean()
+    desvio = treino['y'].std()
+    semanas_alvo = pd.Series(datas).dt.isocalendar().week.astype(int)
+    yhat = semanas_alvo.map(por_semana).fillna(treino['y'].mean()).to_numpy()
+    previsao = pd.DataFrame({'ds': datas, 'yhat': yhat,
+                             'yhat_lower': yhat - 1.28 * desvio, 'yhat_upper': yhat + 1.28 * desvio})
+    return previsao, None
+
+
+MOTORES = {
+    'prophet': motor_prophet,
+    'prophet_app': motor_prophet_app,
+    'prophet_ia': motor_prophet_ia,
+    'ingenuo_sazonal': motor_ingenuo_sazonal,
+}
+
+
+# Motores que usam a configuração de produção (padrão + armazém de parâmetros ajustados).
+# Resolvida no processo pai por (gás, lat, lon): entra na chave do cache, então
+# um ajuste novo no armazém invalida os folds antigos.
+CONFIGURACOES = {
+    'prophet_app': lambda gas, lat, lon: dados_satelite.opcoes_prophet(gas, lat, lon),
+    'prophet_ia': lambda gas, lat, lon: dados_satelite.opcoes_prophet(gas, lat, lon, yearly_seasonality=True),
+}
+
+
+def registrar_motor(nome, funcao):
+    """
+    Permite comparar qualquer outro motor nos mesmos folds.
+    Registre no nível do módulo: o pool de processos reimporta os módulos nos workers.
+    """
+    MOTORES[nome] = funcao
+
+
+# --- 2. CORTES ---
+def gerar_cortes(df, horizonte_dias=90, periodo_dias=90, treino_min_dias=365):
+    """Datas de corte a cada `periodo_dias`, com treino mínimo e horizonte completo."""
+    inicio = df['ds'].min() + pd.Timedelta(days=treino_min_dias)
+    fim = df['ds'].max() - pd.Timedelta(days=horizonte_dias)
+    if inicio > fim:
+        return []
+    return list(pd.date_range(inicio.normalize(), fim, freq=f'{periodo_dias}D'))
+
+
+# --- 3. FOLD (COM CACHE) ---
+def _chave_fold(site, gas, motor, corte, horizonte_dias, treino, parametros=None):
+    """Inclui o hash dos dados de treino: se a série mudar, o fold é recalculado."""
+    h = hashlib.sha256()
+    h.update(f"{site}|{gas}|{motor}|{corte:%Y-%m-%d}|{horizonte_dias}".encode())
+    if parametros:
+        h.update(repr(sorted(parametros.items())).encode())
+    h.update(pd.util.hash_pandas_object(treino[['ds', 'y']], index=False).to_numpy().tobytes())
+    return h.hexdigest()[:20]
+
+
+def _caminho_fold(chave):
+    return os.path.join(PASTA_CACHE, f"{chave}.parquet")
+
+
+def preparar_fold(site, gas, motor, corte, horizonte_dias, df, parametros=None, coordenadas=None):
+    """
+    Monta a tarefa de um fold só com as fatias que ele usa (treino e teste) e a chave do cache.
+    `coordenadas` (lat, lon) escolhe os parâmetros ajustados da região nos motores de CONFIGURACOES.
+    """
+    parametros = dict(parametros or {})
+    if motor in CONFIGURACOES:
+        lat, lon = coordenadas or (None, None)
+        parametros = {**CONFIGURACOES[motor](gas, lat, lon), **parametros}
+    treino = df[df['ds'] <= corte]
+    teste = df[(df['ds'] > corte) & (df['ds'] <= corte + pd.Timedelta(days=horizonte_dias))]
+    return {'site': site, 'gas': gas, 'motor': motor, 'corte': corte, 'horizonte_dias': horizonte_dias,
+            'treino': treino, 'teste': teste, 'parametros': parametros,
+            'chave': _chave_fold(site, gas, motor, corte, horizonte_dias, treino, parametros)}
+
+
+def executar_fold(tarefa):
+    """Roda um fold de preparar_fold (função de topo para poder ir ao pool de processos)."""
+    caminho = _caminho_fold(tarefa['chave'])
+    if os.path.exists(caminho):
+        return pd.read_parquet(caminho)
+
+    treino, teste, corte = tarefa['treino'], tarefa['teste'], tarefa['corte']
+    if teste.empty or len(treino) < 5:
+        # Lacuna nos dados (ex: satélite fora do ar): fold vazio, mas com os tipos certos
+        resultado = pd.DataFrame({'ds': pd.Series(dtype='datetime64[ns]'),
+                                  **{c: pd.Series(dtype='float64') for c in ['y', 'yhat', 'yhat_lower', 'yhat_upper']}})
+    else:
+        previsao, _ = MOTORES[tarefa['motor']](treino, teste['ds'].drop_duplicates().to_numpy(), **tarefa['parametros'])
+        resultado = teste[['ds', 'y']].merge(previsao, on='ds', how='left')
+
+    resultado = resultado.assign(site=tarefa['site'], gas=tarefa['gas'], motor=tarefa['motor'], corte=corte,
+                                 horizonte=(resultado['ds'] - corte).dt.days)
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    resultado.to_parquet(temporario, index=False)
+    os.replace(temporario, caminho)
+    return resultado
+
+
+def rodar_folds(tarefas, executor):
+    """Folds em cache são lidos aqui mesmo; só os que faltam vão (com suas fatias) ao pool."""
+    resultados = [None] * len(tarefas)
+    pendentes = []
+    for i, tarefa in enumerate(tarefas):
+        caminho = _caminho_fold(tarefa['chave'])
+        if os.path.exists(caminho):
+            resultados[i] = pd.read_parquet(caminho)
+        else:
+            pendentes.append(i)
+    for i, resultado in zip(pendentes, executor.map(executar_fold, [tarefas[i] for i in pendentes])):
+        resultados[i] = resultado
+    return resultados
+
+
+# --- 4. ORQUESTRAÇÃO ---
+def rodar_backtest(series, motores=('prophet_app',), horizonte_dias=90, periodo_dias=90,
+                   treino_min_dias=365, max_workers=None, coordenadas=None):
+    """
+    series: {(site, gas): DataFrame(ds, y)}
+    coordenadas: {(site, gas): (lat, lon)}, para os parâmetros ajustados por região.
+    Devolve todas as previsões de teste (uma linha por observação x motor x corte).
+    """
+    coordenadas = coordenadas or {}
+    tarefas = []
+    for (site, gas), df in series.items():
+        if df is None or df.empty:
+            continue
+        df = df[['ds', 'y']].sort_values('ds').reset_index(drop=True)
+        for corte in gerar_cortes(df, horizonte_dias, periodo_dias, treino_min_dias):
+            for motor in motores:
+                tarefas.append(preparar_fold(site, gas, motor, corte, horizonte_dias, df,
+                                             coordenadas=coordenadas.get((site, gas))))
+
+    if not tarefas:
+        return pd.DataFrame()
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        partes = rodar_folds(tarefas, executor)
+    return pd.concat(partes, ignore_index=True)
+
+
+def tabela_metricas(resultados, por=('gas', 'motor')):
+    """MAE, MAPE (%) e cobertura do intervalo de incerteza por grupo."""
+    if resultados.empty:
+        return pd.DataFrame(columns=list(por) + ['mae', 'mape', 'cobertura', 'n'])
+    r = resultados.dropna(subset=['yhat'])
+    erro = (r['y'] - r['yhat']).abs()
+    r = r.assign(_erro=erro,
+                 _erro_pct=np.where(r['y'] != 0, erro / r['y'].abs() * 100, np.nan),
+                 _dentro=((r['y'] >= r['yhat_lower']) & (r['y'] <= r['yhat_upper'])).astype(float))
+    return (r.groupby(list(por))
+            .agg(mae=('_erro', 'mean'), mape=('_erro_pct', 'mean'), cobertura=('_dentro', 'mean'), n=('_erro', 'size'))
+            .reset_index())
+
+
+def carregar_series(sites, fonte=None):
+    """Busca as séries dos sites (site, gas, lat, lon) na fonte (padrão: Earth Engine)."""
+    buscar = fonte.get_data if fonte is not None else dados_satelite.get_data
+    series = {}
+    for linha in sites.itertuples():
+        df, _ = buscar(linha.lat, linha.lon, linha.gas)
+        series[(linha.site, linha.gas)] = df
+    return series
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtesting rolling-origin dos modelos de previsão")
+    parser.add_argument('sites', help="CSV com colunas site,gas,lat,lon")
+    parser.add_argument('--motores', default='prophet_app,ingenuo_sazonal')
+    parser.add_argument('--horizonte', type=int, default=90, help="dias previstos em cada fold")
+    parser.add_argument('--periodo', type=int, default=90, help="dias entre cortes")
+    parser.add_argument('--treino-min', type=int, default=365)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--fake', action='store_true', help="usa a fonte sintética (sem Earth Engine)")
+    parser.add_argument('--saida', help="CSV para salvar a tabela de métricas")
+    args = parser.parse_args()
+
+    fonte = None
+    if args.fake:
+        from api_servico import FonteFake
+        fonte = FonteFake()
+
+    sites = pd.read_csv(args.sites)
+    series = carregar_series(sites, fonte)
+    coordenadas = {(l.site, l.gas): (l.lat, l.lon) for l in sites.itertuples()}
+    print(f"📡 {len(series)} séries carregadas. Rodando folds...")
+    resultados = rodar_backtest(series, args.motores.split(','), args.horizonte, args.periodo,
+                                args.treino_min, args.workers, coordenadas)
+    metricas = tabela_metricas(resultados)
+    print(metricas.to_string(index=False))
+    if args.saida:
+        metricas.to_csv(args.saida, index=False)
+        print(f"💾 Métricas salvas em '{args.saida}'")
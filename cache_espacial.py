@@ -0,0 +1,154 @@
+import math
+
+import pandas as pd
+
+import cache_memoria
+import dados_satelite
+
+# --- CACHE ESPACIAL (AJUSTE À GRADE + VIZINHOS) ---
+# Dois cliques a 10 m de distância caem no mesmo pixel do Sentinel-5P na escala
+# de 3000-5000 m. Aqui a coordenada é ajustada ao centro da célula (alinhada à
+# grade nativa de cada gás) e as séries já buscadas ficam num índice por célula.
+
+METROS_POR_GRAU = 111320
+
+
+def tamanho_celula(gas_type):
+    """Lado da célula em graus: a escala de redução arredondada para cima na grade nativa."""
+    chave = dados_satelite.chave_gas(gas_type)
+    cfg = dados_satelite.GASES[chave] if chave else dados_satelite.NDVI
+    grade = cfg['grade']
+    return grade * max(1, math.ceil(cfg['scale'] / METROS_POR_GRAU / grade - 1e-9))
+
+
+def celula(lat, lon, gas_type):
+    """Chave inteira (linha, coluna) da célula que contém a coordenada."""
+    lado = tamanho_celula(gas_type)
+    return math.floor(lat / lado), math.floor(lon / lado)
+
+
+def centro_celula(linha, coluna, gas_type):
+    lado = tamanho_celula(gas_type)
+    casas = 6
+    return round((linha + 0.5) * lado, casas), round((coluna + 0.5) * lado, casas)
+
+
+def ajustar_a_grade(lat, lon, gas_type):
+    """Coordenada "snapped": centro da célula da grade do gás."""
+    return centro_celula(*celula(lat, lon, gas_type), gas_type)
+
+
+class IndiceEspacial:
+    """
+    Índice por célula (chave de grade) das séries já buscadas.
+    Consulta dentro de uma célula conhecida é servida localmente.
+    As séries ficam compactadas num cache LRU com orçamento de memória.
+    """
+
+    def __init__(self, ttl=3600, max_bytes=None):
+        self._cache = cache_memoria.CacheOrcado(max_bytes=max_bytes, ttl=ttl)
+
+    @property
+    def acertos(self):
+        return self._cache.acertos
+
+    @property
+    def faltas(self):
+        return self._cache.faltas
+
+    def guardar(self, gas_type, linha, coluna, valor):
+        """Guarda e devolve o valor já compactado."""
+        return self._cache.guardar((gas_type, linha, coluna), valor)
+
+    def obter(self, gas_type, linha, coluna):
+        return self._cache.obter((gas_type, linha, coluna))
+
+    def contem(self, gas_type, linha, coluna):
+        """Consulta sem contar acerto/falta."""
+        return self._cache.contem((gas_type, linha, coluna))
+
+    def vizinhos(self, gas_type, linha, coluna, raio=1):
+        """Células já em cache no anel de `raio` células ao redor (sem a central)."""
+        encontrados = []
+        for dl in range(-raio, raio + 1):
+            for dc in range(-raio, raio + 1):
+                if dl == 0 and dc == 0:
+                    continue
+                valor = self._cache.valor_se_valido((gas_type, linha + dl, coluna + dc))
+                if valor is not None:
+                    encontrados.append((linha + dl, coluna + dc, valor))
+        return encontrados
+
+    def taxa_acerto(self):
+        return self._cache.taxa_acerto()
+
+    def uso(self):
+        """Entradas, MB usados/orçamento, despejos e taxa de acerto."""
+        return self._cache.uso()
+
+
+def interpolar_idw(lat, lon, vizinhos, gas_type, coluna_valor='y'):
+    """Média ponderada pelo inverso do quadrado da distância, data a data."""
+    partes = []
+    for linha, coluna, df in vizinhos:
+        if df.empty:
+            continue
+        c_lat, c_lon = centro_celula(linha, coluna, gas_type)
+        peso = 1.0 / max((c_lat - lat) ** 2 + (c_lon - lon) ** 2, 1e-12)
+        partes.append(df[['ds', coluna_valor]].assign(_peso=peso))
+    if not partes:
+        return pd.DataFrame(columns=['ds', coluna_valor])
+
+    todos = pd.concat(partes, ignore_index=True)
+    todos['_ponderado'] = todos[coluna_valor] * todos['_peso']
+    soma = todos.groupby('ds')[['_ponderado', '_peso']].sum()
+    df = (soma['_ponderado'] / soma['_peso']).rename(coluna_valor).reset_index()
+    return df.sort_values('ds').reset_index(drop=True)
+
+
+# Índice compartilhado pelo processo (app, API)
+INDICE = IndiceEspacial()
+
+
+def em_cache(lat, lon, gas_type, indice=INDICE):
+    """A série desta célula já está no índice? (resposta imediata garantida)"""
+    chave = dados_satelite.chave_gas(gas_type)
+    return chave is not None and indice.contem(chave, *celula(lat, lon, chave))
+
+
+def get_data(lat, lon, gas_type, interpolar=False, indice=INDICE, buscar=None):
+    """
+    Igual a dados_satelite.get_data, mas:
+    - busca sempre no centro da célula (cliques próximos reaproveitam a série);
+    - com `interpolar=True`, se houver células vizinhas em cache com dados,
+      interpola entre elas em vez de ir ao Earth Engine.
+    """
+    chave = dados_satelite.chave_gas(gas_type)
+    if chave is None:
+        return pd.DataFrame(), None
+    buscar = buscar or dados_satelite.get_data
+
+    linha, coluna = celula(lat, lon, chave)
+    em_cache = indice.obter(chave, linha, coluna)
+    if em_cache is not None:
+        return em_cache
+
+    if interpolar:
+        # Vizinhos vazios (busca que falhou, oceano) não servem: sem nenhum útil, busca a célula
+        vizinhos = [(l, c, v[0]) for l, c, v in indice.vizinhos(chave, linha, coluna) if not v[0].empty]
+        if vizinhos:
+            df = interpolar_idw(lat, lon, vizinhos, chave)
+            return df, dados_satelite.GASES[chave]['band']
+
+    lat_c, lon_c = centro_celula(linha, coluna, chave)
+    return indice.guardar(chave, linha, coluna, buscar(lat_c, lon_c, chave))
+
+
+def get_ndvi(lat, lon, indice=INDICE, buscar=None):
+    buscar = buscar or dados_satelite.get_ndvi
+    linha, coluna = celula(lat, lon, 'NDVI')
+    em_cache = indice.obter('NDVI', linha, coluna)
+    if em_cache is not None:
+        return em_cache
+    lat_c, lon_c = centro_celula(linha, coluna, 'NDVI')
+    return indice.guardar('NDVI', linha, coluna, buscar(lat_c, lon_c))
@@ -0,0 +1,141 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# --- CACHE COM ORÇAMENTO DE MEMÓRIA ---
+# Com muitos usuários e coordenadas, caches sem limite crescem até derrubar a
+# réplica. Aqui cada valor é guardado em forma compacta (ds em datetime64,
+# valores em float32, só as colunas que a UI usa), o tamanho é contabilizado
+# e as entradas menos usadas recentemente saem quando o orçamento estoura.
+
+ORCAMENTO_MB = float(os.environ.get('CARBONCAST_CACHE_MB', '256'))
+COLUNAS_PREVISAO = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+# --- 1. REPRESENTAÇÃO COMPACTA ---
+def compactar(df, colunas=None):
+    """Cópia só com `colunas` (se dadas), 'ds' em datetime64 e colunas float em float32."""
+    if not isinstance(df, pd.DataFrame):
+        return df
+    if colunas is not None:
+        df = df[[c for c in colunas if c in df.columns]]
+    compacto = {}
+    for nome, coluna in df.items():
+        if nome == 'ds':
+            compacto[nome] = pd.to_datetime(coluna).to_numpy(dtype='datetime64[ns]')
+        elif pd.api.types.is_float_dtype(coluna):
+            compacto[nome] = coluna.to_numpy(dtype=np.float32)
+        else:
+            compacto[nome] = coluna.to_numpy()
+    return pd.DataFrame(compacto)
+
+
+def compactar_previsao(forecast):
+    """O forecast do Prophet tem ~20 colunas de componentes; a UI/API usam 4."""
+    return compactar(forecast, COLUNAS_PREVISAO)
+
+
+def compactar_resultado(valor):
+    """Compacta DataFrames soltos ou dentro de tuplas, como o (df, band) do get_data."""
+    if isinstance(valor, tuple):
+        return tuple(compactar(v) for v in valor)
+    return compactar(valor)
+
+
+def tamanho_bytes(valor):
+    """Tamanho aproximado em memória (DataFrames pelo memory_usage profundo)."""
+    if isinstance(valor, pd.DataFrame):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (tuple, list)):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_bytes(v) for v in valor.values())
+    return sys.getsizeof(valor)
+
+
+# --- 2. CACHE LRU COM ORÇAMENTO ---
+class CacheOrcado:
+    """
+    Dicionário LRU limitado por bytes (e por TTL).
+    Os valores são compactados ao entrar; `uso()` informa o consumo atual.
+    """
+
+    def __init__(self, max_bytes=None, ttl=3600):
+        self.max_bytes = int(ORCAMENTO_MB * 1024 * 1024) if max_bytes is None else int(max_bytes)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self.bytes = 0
+        self.acertos = 0
+        self.faltas = 0
+        self.despejos = 0
+
+    def _valido(self, entrada):
+        return self.ttl is None or time.time() - entrada['criado'] < self.ttl
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if entrada is not None:
+            self.bytes -= entrada['bytes']
+        return entrada
+
+    def guardar(self, chave, valor):
+        valor = compactar_resultado(valor)
+        tamanho = tamanho_bytes(valor)
+        with self._lock:
+            self._remover(chave)
+            if tamanho > self.max_bytes:
+                return valor  # maior que o orçamento inteiro: não guarda
+            self._entradas[chave] = {'valor': valor, 'criado': time.time(), 'bytes': tamanho}
+            self.bytes += tamanho
+            while self.bytes > self.max_bytes:
+                antiga = next(iter(self._entradas))
+                self._remover(antiga)
+                self.despejos += 1
+        return valor
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None or not self._valido(entrada):
+                self._remover(chave)
+                self.faltas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada['valor']
+
+    def contem(self, chave):
+        """Consulta sem contar acerto/falta nem mexer na ordem LRU."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            return entrada is not None and self._valido(entrada)
+
+    def valor_se_valido(self, chave):
+        """Como `contem`, mas devolve o valor (ou None)."""
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            return entrada['valor'] if entrada is not None and self._valido(entrada) else None
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def taxa_acerto(self):
+        total = self.acertos + self.faltas
+        return self.acertos / total if total else 0.0
+
+    def uso(self):
+        with self._lock:
+            return {'entradas': len(self._entradas), 'mb': round(self.bytes / 1024 ** 2, 2),
+                    'max_mb': round(self.max_bytes / 1024 ** 2, 2), 'despejos': self.despejos,
+                    'taxa_acerto': round(self.taxa_acerto(), 3)}
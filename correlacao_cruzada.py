@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# --- MOTOR DE CORRELAÇÃO CRUZADA POLUIÇÃO x VEGETAÇÃO ---
+# Versão numérica da "Análise Cruzada: Saúde da Floresta" do app, para uma
+# carteira inteira de áreas de uma vez:
+#   1) alinha poluente e NDVI numa grade comum (médias por período);
+#   2) calcula a correlação cruzada defasada de todos os sites num único
+#      passo vetorizado via FFT, cada par só na sobreposição em que os dois
+#      têm dado (as pontas fora do período de um site ficam NaN, nunca são
+#      estendidas com valor constante);
+#   3) devolve os sites ranqueados com a melhor defasagem de cada um.
+#
+# Convenção de defasagem: lag > 0 significa que a poluição ANTECEDE a
+# resposta do NDVI em `lag` períodos.
+
+
+def alinhar_em_grade(series, freq='W', coluna='y', indice=None):
+    """
+    Recebe {site: DataFrame(ds, coluna)} e devolve uma matriz (n_sites x n_periodos)
+    com a média por período, mais o índice de tempo usado.
+    Períodos sem leitura ficam NaN. Passe `indice` para reaproveitar a grade de outra série.
+    """
+    sites = list(series)
+    reamostradas = []
+    for site in sites:
+        df = series[site]
+        if df is None or df.empty:
+            reamostradas.append(pd.Series(dtype='float64', name=site))
+            continue
+        s = df.set_index(pd.to_datetime(df['ds']))[coluna].astype('float64')
+        reamostradas.append(s.resample(freq).mean().rename(site))
+
+    tabela = pd.concat(reamostradas, axis=1)
+    if indice is None:
+        if tabela.dropna(how='all').empty:
+            indice = pd.DatetimeIndex([])
+        else:
+            indice = pd.date_range(tabela.index.min(), tabela.index.max(), freq=freq)
+    tabela = tabela.reindex(indice)
+    return tabela[sites].to_numpy(dtype='float64').T, indice
+
+
+def _preencher(matriz):
+    """Interpola linearmente só as lacunas internas de cada linha; antes do primeiro e depois do último dado fica NaN."""
+    saida = matriz.copy()
+    x = np.arange(matriz.shape[1])
+    for i, linha in enumerate(matriz):
+        validos = np.flatnonzero(~np.isnan(linha))
+        if len(validos) >= 2:
+            miolo = slice(validos[0], validos[-1] + 1)
+            saida[i, miolo] = np.interp(x[miolo], validos, linha[validos])
+    return saida
+
+
+def correlacao_defasada(a, b, max_lag, min_periodos=2):
+    """
+    Correlação de Pearson entre a[t] e b[t + lag], para lag em [-max_lag, max_lag],
+    de todas as linhas ao mesmo tempo (FFT ao longo do eixo do tempo).
+    a, b: matrizes (n_sites x n_periodos); NaN = sem dado. Cada lag usa só os t em que
+    a[t] e b[t + lag] existem; com menos de `min_periodos` pares ou variância nula, NaN.
+    Devolve (lags, matriz n_sites x n_lags).
+    """
+    n = a.shape[1]
+    ma, mb = ~np.isnan(a), ~np.isnan(b)
+
+    def _centrar(m, validos):
+        media = np.where(validos, m, 0.0).sum(axis=1) / np.maximum(validos.sum(axis=1), 1)
+        return np.where(validos, m - media[:, None], 0.0)
+
+    a, b = _centrar(a, ma), _centrar(b, mb)
+    ma, mb = ma.astype('float64'), mb.astype('float64')
+
+    tamanho = 1 << int(np.ceil(np.log2(2 * n - 1)))
+    max_lag = min(max_lag, n - 1)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    def _cruzada(x, y):
+        # cc[k] = sum_t x[t] * y[t + k]  (índices negativos no fim do vetor circular)
+        cc = np.fft.irfft(np.conj(np.fft.rfft(x, tamanho, axis=1)) * np.fft.rfft(y, tamanho, axis=1), tamanho, axis=1)
+        return cc[:, lags % tamanho]
+
+    pares = np.rint(_cruzada(ma, mb))
+    soma_a, soma_b = _cruzada(a, mb), _cruzada(ma, b)
+    quad_a, quad_b = _cruzada(a ** 2, mb), _cruzada(ma, b ** 2)
+    produto = _cruzada(a, b)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = produto - soma_a * soma_b / pares
+        var_a = quad_a - soma_a ** 2 / pares
+        var_b = quad_b - soma_b ** 2 / pares
+        corr = cov / np.sqrt(var_a * var_b)
+    # Variância "nula" relativa à soma de quadrados: resíduo de arredondamento da FFT
+    degenerado = (var_a <= 1e-9 * np.abs(quad_a)) | (var_b <= 1e-9 * np.abs(quad_b))
+    corr[(pares < max(min_periodos, 2)) | degenerado] = np.nan
+    return lags, np.clip(corr, -1.0, 1.0)
+
+
+def analisar_carteira(poluicao, ndvi, freq='W', max_lag=12, min_periodos=20):
+    """
+    poluicao: {site: DataFrame(ds, y)}   (série do satélite ou forecast['yhat'] renomeado)
+    ndvi:     {site: DataFrame(ds, ndvi)}
+    Devolve um DataFrame ranqueado por |correlação| na melhor defasagem.
+    """
+    sites = [s for s in poluicao if s in ndvi]
+    if not sites:
+        return pd.DataFrame(columns=['site', 'melhor_lag', 'correlacao', 'corr_lag0', 'n_periodos'])
+
+    m_pol, indice = alinhar_em_grade({s: poluicao[s] for s in sites}, freq, 'y')
+    m_ndvi, _ = alinhar_em_grade({s: ndvi[s] for s in sites}, freq, 'ndvi', indice=indice)
+
+    # Sobreposição real (períodos com leitura dos dois, sem interpolação)
+    n_validos = (~np.isnan(m_pol) & ~np.isnan(m_ndvi)).sum(axis=1)
+    if len(indice) < 2:
+        lags, corr = np.array([0]), np.full((len(sites), 1), np.nan)
+    else:
+        lags, corr = correlacao_defasada(_preencher(m_pol), _preencher(m_ndvi), max_lag, min_periodos)
+
+    melhor = np.where(np.isnan(corr), -1.0, np.abs(corr)).argmax(axis=1)
+    resultado = pd.DataFrame({
+        'site': sites,
+        'melhor_lag': lags[melhor],
+        'correlacao': corr[np.arange(len(sites)), melhor],
+        'corr_lag0': corr[:, len(lags) // 2],
+        'n_periodos': n_validos,
+    })
+    resultado.loc[resultado['n_periodos'] < min_periodos, ['melhor_lag', 'correlacao', 'corr_lag0']] = np.nan
+    resultado['_ordem'] = resultado['correlacao'].abs()
+    return (resultado.sort_values('_ordem', ascending=False, na_position='last')
+            .drop(columns='_ordem').reset_index(drop=True))
@@ -0,0 +1,152 @@
+import datetime
+
+import pandas as pd
+
+from inicializacao import obter_ee
+
+# --- CATÁLOGO DE GASES (SENTINEL-5P) ---
+# Mesmas coleções/escalas usadas pelo app; fica aqui para ser reaproveitado
+# por scripts e serviços que não dependem do Streamlit.
+# 'grade' é a resolução nativa do produto L3 no Earth Engine, em graus (~1,1 km).
+GASES = {
+    'NO2': {
+        'col_id': 'COPERNICUS/S5P/NRTI/L3_NO2', 'band': 'NO2_column_number_density', 'scale': 3000, 'grade': 0.01,
+        'vis': {'min': 0, 'max': 0.0002, 'palette': ['black', 'blue', 'purple', 'cyan', 'green', 'yellow', 'red']},
+    },
+    'CH4': {
+        'col_id': 'COPERNICUS/S5P/OFFL/L3_CH4', 'band': 'CH4_column_volume_mixing_ratio_dry_air', 'scale': 5000, 'grade': 0.01,
+        'vis': {'min': 1750, 'max': 1900, 'palette': ['black', 'blue', 'cyan', 'green', 'yellow', 'red']},
+    },
+    'CO': {
+        'col_id': 'COPERNICUS/S5P/NRTI/L3_CO', 'band': 'CO_column_number_density', 'scale': 3000, 'grade': 0.01,
+        'vis': {'min': 0, 'max': 0.05, 'palette': ['black', 'blue', 'purple', 'cyan', 'green', 'yellow', 'red']},
+    },
+    'SO2': {
+        'col_id': 'COPERNICUS/S5P/NRTI/L3_SO2', 'band': 'SO2_column_number_density', 'scale': 3000, 'grade': 0.01,
+        'vis': {'min': 0, 'max': 0.0005, 'palette': ['black', 'blue', 'purple', 'cyan', 'green', 'yellow', 'red']},
+    },
+}
+
+# MODIS MOD13Q1: pixel de 250 m, reduzido a 1000 m
+NDVI = {'col_id': 'MODIS/006/MOD13Q1', 'band': 'NDVI', 'scale': 1000, 'grade': 0.0025}
+
+DATA_INICIO, DATA_FIM = '2022-01-01', '2025-01-01'
+
+
+def remover_extremos(df, coluna='y'):
+    """Corta os 1% extremos (ruído de nuvem/borda de órbita) quando há pontos suficientes."""
+    if len(df) > 10:
+        q_low = df[coluna].quantile(0.01)
+        q_hi  = df[coluna].quantile(0.99)
+        df = df[(df[coluna] < q_hi) & (df[coluna] > q_low)]
+    return df
+
+
+def chave_gas(gas_type):
+    """Aceita tanto 'NO2' quanto o rótulo do app ('NO2 (Urbano)')."""
+    for chave in GASES:
+        if chave in gas_type:
+            return chave
+    return None
+
+
+# --- SÉRIE DE POLUENTES ---
+def get_data(lat, lon, gas_type):
+    chave = chave_gas(gas_type)
+    if chave is None:
+        return pd.DataFrame(), None
+
+    ee = obter_ee()
+    col_id, band, scale = GASES[chave]['col_id'], GASES[chave]['band'], GASES[chave]['scale']
+    ponto = ee.Geometry.Point([lon, lat])
+
+    collection = (ee.ImageCollection(col_id)
+                  .filterBounds(ponto)
+                  .filterDate(DATA_INICIO, DATA_FIM)
+                  .select(band))
+
+    def extract(img):
+        date = img.date().format("YYYY-MM-dd")
+        val = img.reduceRegion(ee.Reducer.mean(), ponto, scale).get(band)
+        return img.set({'ds': date, 'y': val})
+
+    mapped_col = collection.map(extract)
+    clean_col = mapped_col.filter(ee.Filter.notNull(['y'])).limit(1000, 'system:time_start')
+
+    data = clean_col.reduceColumns(ee.Reducer.toList(2), ['ds', 'y']).get('list').getInfo()
+    df = pd.DataFrame(data, columns=['ds', 'y'])
+
+    if not df.empty:
+        df['ds'] = pd.to_datetime(df['ds'])
+        df = df.sort_values('ds')
+        df = remover_extremos(df)
+
+    return df, band
+
+
+# --- SAÚDE DA VEGETAÇÃO (NDVI) ---
+def get_ndvi(lat, lon):
+    ee = obter_ee()
+    ponto = ee.Geometry.Point([lon, lat])
+    collection = (ee.ImageCollection(NDVI['col_id'])
+                  .filterBounds(ponto)
+                  .filterDate(DATA_INICIO, DATA_FIM)
+                  .select(NDVI['band']))
+
+    def extract(img):
+        date = img.date().format("YYYY-MM-dd")
+        val = img.reduceRegion(ee.Reducer.mean(), ponto, NDVI['scale']).get(NDVI['band'])
+        return img.set({'ds': date, 'ndvi': val})
+
+    mapped = collection.map(extract).filter(ee.Filter.notNull(['ndvi'])).limit(500, 'system:time_start')
+    data = mapped.reduceColumns(ee.Reducer.toList(2), ['ds', 'ndvi']).get('list').getInfo()
+
+    df = pd.DataFrame(data, columns=['ds', 'ndvi'])
+    if not df.empty:
+        df['ds'] = pd.to_datetime(df['ds'])
+        df['ndvi'] = df['ndvi'] / 10000
+        df = df.sort_values('ds')
+    return df
+
+
+# --- PREVISÃO (PROPHET) ---
+PROPHET_PADRAO = {'daily_seasonality': False, 'weekly_seasonality': True}
+
+
+def opcoes_prophet(gas_type=None, lat=None, lon=None, **base):
+    """
+    Configuração do Prophet em produção: padrão (+ `base`) sobrescrito pelos parâmetros
+    ajustados offline (ajuste_hiperparametros.py) para o gás/região, se houver.
+    Compartilhada pelo app, previsao_ia e backtesting.
+    """
+    from ajuste_hiperparametros import parametros_para
+
+    opcoes = {**PROPHET_PADRAO, **base}
+    chave = chave_gas(gas_type) if gas_type is not None else None
+    if chave is not None:
+        opcoes.update(parametros_para(chave, lat, lon))
+    return opcoes
+
+
+def run_forecast(df, gas_type=None, lat=None, lon=None):
+    # Import tardio: Prophet/Stan é o módulo mais lento de carregar
+    from prophet import Prophet
+
+    m = Prophet(**opcoes_prophet(gas_type, lat, lon))
+    m.fit(df)
+    future = m.make_future_dataframe(periods=365*2)
+    forecast = m.predict(future)
+    return forecast
+
+
+# --- MAPA DE CALOR ---
+def get_heatmap_layer(gas_type):
+    chave = chave_gas(gas_type)
+    ee = obter_ee()
+    col_id, band, vis = GASES[chave]['col_id'], GASES[chave]['band'], GASES[chave]['vis']
+
+    end_date = datetime.datetime.now()
+    start_date = end_date - datetime.timedelta(days=30)
+    collection = ee.ImageCollection(col_id).filterDate(start_date, end_date).select(band).mean()
+    map_id_dict = ee.Image(collection).getMapId(vis)
+    return map_id_dict['tile_fetcher'].url_format
@@ -0,0 +1,177 @@
+import argparse
+import csv
+import datetime
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import artefatos
+import cache_espacial
+import dados_satelite
+
+# --- DAEMON DE PRÉ-CÁLCULO DA WATCHLIST ---
+# Os analistas revisitam todo dia os mesmos sites auditados. Este processo lê a
+# watchlist (site, gas, lat, lon), atualiza série do satélite, NDVI e previsão
+# numa agenda estilo cron (padrão: 03:00, fora do horário comercial), com
+# concorrência limitada, e grava os artefatos onde o app já lê.
+#
+# Exemplos:
+#   python daemon_precomputo.py watchlist.csv                  (agenda padrão "0 3 * * *")
+#   python daemon_precomputo.py watchlist.csv --agenda "30 2 * * 1-5" --workers 4
+#   python daemon_precomputo.py watchlist.csv --uma-vez
+
+AGENDA_PADRAO = "0 3 * * *"
+ARQUIVO_RELATORIO = 'relatorio_jobs.csv'
+
+
+# --- 1. AGENDA (SUBCONJUNTO DO CRON: minuto hora dia mês dia_semana) ---
+def _campo_cron(texto, minimo, maximo):
+    valores = set()
+    for parte in texto.split(','):
+        passo = 1
+        if '/' in parte:
+            parte, passo = parte.split('/')
+            passo = int(passo)
+        if parte == '*':
+            inicio, fim = minimo, maximo
+        elif '-' in parte:
+            inicio, fim = (int(x) for x in parte.split('-'))
+        else:
+            inicio = fim = int(parte)
+        valores.update(range(inicio, fim + 1, passo))
+    return valores
+
+
+def interpretar_agenda(expressao):
+    """
+    Campos do cron em conjuntos. Como no cron, se dia do mês e dia da semana estiverem
+    ambos restritos (nenhum começa com '*'), basta um dos dois casar.
+    """
+    campos = expressao.split()
+    if len(campos) != 5:
+        raise ValueError(f"Agenda inválida (esperado 5 campos): {expressao}")
+    minutos, horas, dias, meses, semana = campos
+    return {
+        'minuto': _campo_cron(minutos, 0, 59),
+        'hora': _campo_cron(horas, 0, 23),
+        'dia': _campo_cron(dias, 1, 31),
+        'mes': _campo_cron(meses, 1, 12),
+        # cron: 0 (ou 7) = domingo; Python: weekday() 0 = segunda
+        'semana': {(d - 1) % 7 for d in _campo_cron(semana, 0, 7)},
+        'dia_ou_semana': not dias.startswith('*') and not semana.startswith('*'),
+    }
+
+
+def proxima_execucao(agenda, depois_de):
+    instante = depois_de.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+    limite = instante + datetime.timedelta(days=366)
+    while instante < limite:
+        no_dia, na_semana = instante.day in agenda['dia'], instante.weekday() in agenda['semana']
+        dia_ok = (no_dia or na_semana) if agenda['dia_ou_semana'] else (no_dia and na_semana)
+        if (instante.month in agenda['mes'] and dia_ok
+                and instante.hour in agenda['hora'] and instante.minute in agenda['minuto']):
+            return instante
+        if instante.hour not in agenda['hora']:
+            instante = instante.replace(minute=0) + datetime.timedelta(hours=1)
+        else:
+            instante += datetime.timedelta(minutes=1)
+    raise ValueError("Agenda nunca dispara.")
+
+
+def maior_intervalo_h(agenda, inicio, rodadas=14):
+    """Maior espaço (em horas) entre as próximas `rodadas` execuções da agenda."""
+    instantes = [proxima_execucao(agenda, inicio)]
+    for _ in range(rodadas):
+        instantes.append(proxima_execucao(agenda, instantes[-1]))
+    return max((b - a).total_seconds() / 3600 for a, b in zip(instantes, instantes[1:]))
+
+
+# --- 2. JOB DE UM SITE ---
+def atualizar_site(site, gas, lat, lon, pasta=None):
+    """Busca série, NDVI e previsão no centro da célula e grava os artefatos."""
+    lat_c, lon_c = cache_espacial.ajustar_a_grade(lat, lon, gas)
+    df, band = dados_satelite.get_data(lat_c, lon_c, gas)
+    if df.empty or len(df) < 5:
+        raise ValueError("Sem dados suficientes do satélite.")
+    previsao = dados_satelite.run_forecast(df, gas, lat, lon)
+    lat_n, lon_n = cache_espacial.ajustar_a_grade(lat, lon, 'NDVI')
+    ndvi = dados_satelite.get_ndvi(lat_n, lon_n)
+    return artefatos.salvar(gas, lat, lon, df, ndvi, previsao, meta={'site': site, 'band': band}, pasta=pasta)
+
+
+def _rodar_job(linha, pasta=None):
+    inicio = time.perf_counter()
+    registro = {'site': linha['site'], 'gas': linha['gas'], 'inicio': datetime.datetime.now().isoformat(timespec='seconds')}
+    try:
+        atualizar_site(linha['site'], linha['gas'], float(linha['lat']), float(linha['lon']), pasta)
+        registro.update(status='ok', erro='')
+    except Exception as e:
+        registro.update(status='falha', erro=str(e))
+    registro['duracao_s'] = round(time.perf_counter() - inicio, 2)
+    return registro
+
+
+_lock_relatorio = threading.Lock()
+
+
+def _registrar(registros, pasta):
+    caminho = os.path.join(pasta, ARQUIVO_RELATORIO)
+    with _lock_relatorio:
+        os.makedirs(pasta, exist_ok=True)
+        novo = not os.path.exists(caminho)
+        with open(caminho, 'a', newline='', encoding='utf-8') as f:
+            escritor = csv.DictWriter(f, fieldnames=['inicio', 'site', 'gas', 'status', 'duracao_s', 'erro'])
+            if novo:
+                escritor.writeheader()
+            escritor.writerows(registros)
+
+
+def rodar_rodada(watchlist, max_workers=4, pasta=None):
+    """Atualiza todos os sites com no máximo `max_workers` jobs simultâneos."""
+    pasta = pasta or artefatos.PASTA_ARTEFATOS
+    linhas = watchlist.to_dict('records')
+    print(f"🛰️ Rodada iniciada: {len(linhas)} sites, {max_workers} em paralelo.")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        registros = list(executor.map(lambda linha: _rodar_job(linha, pasta), linhas))
+    _registrar(registros, pasta)
+
+    relatorio = pd.DataFrame(registros)
+    falhas = relatorio[relatorio['status'] != 'ok']
+    print(f"✅ {len(relatorio) - len(falhas)} ok, ❌ {len(falhas)} falhas, "
+          f"⏱️ {relatorio['duracao_s'].sum():.1f}s de job (máx {relatorio['duracao_s'].max():.1f}s).")
+    for falha in falhas.itertuples():
+        print(f"   ❌ {falha.site} ({falha.gas}): {falha.erro}")
+    return relatorio
+
+
+def carregar_watchlist(caminho):
+    if caminho.endswith('.json'):
+        return pd.read_json(caminho)
+    return pd.read_csv(caminho)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pré-cálculo agendado da watchlist de sites")
+    parser.add_argument('watchlist', help="CSV/JSON com colunas site,gas,lat,lon")
+    parser.add_argument('--agenda', default=AGENDA_PADRAO, help="expressão cron (min hora dia mês dia_semana)")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--uma-vez', action='store_true', help="roda uma rodada agora e sai")
+    args = parser.parse_args()
+
+    if args.uma_vez:
+        rodar_rodada(carregar_watchlist(args.watchlist), args.workers)
+    else:
+        agenda = interpretar_agenda(args.agenda)
+        intervalo = maior_intervalo_h(agenda, datetime.datetime.now())
+        if intervalo > artefatos.MAX_IDADE_H:
+            print(f"⚠️ A agenda deixa até {intervalo:.0f} h entre rodadas, mais que a idade máxima que o app aceita "
+                  f"({artefatos.MAX_IDADE_H:.0f} h): ajuste CARBONCAST_ARTEFATOS_MAX_H.")
+        while True:
+            proxima = proxima_execucao(agenda, datetime.datetime.now())
+            print(f"💤 Próxima rodada: {proxima:%d/%m/%Y %H:%M}")
+            time.sleep(max(0, (proxima - datetime.datetime.now()).total_seconds()))
+            # Relê a watchlist a cada rodada: sites novos entram sem reiniciar o daemon
+            rodar_rodada(carregar_watchlist(args.watchlist), args.workers)
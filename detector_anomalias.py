@@ -0,0 +1,261 @@
+import argparse
+import math
+import pickle
+
+import pandas as pd
+
+# --- DETECTOR ONLINE DE ANOMALIAS ---
+# Hoje o app só compara dois pontos do Prophet (±5%) e o get_data corta os
+# quantis 1%/99% recalculando sobre a série inteira. Aqui cada site mantém
+# estatísticas incrementais, atualizadas em O(1) a cada nova leitura
+# (S5P diário ou OWM horário), sem reler histórico nem reajustar o Prophet:
+#   - Welford: média/variância do regime atual (referência do CUSUM);
+#   - EWMA: nível e variância recentes (detecção de picos);
+#   - P²: quantis 1% e 99% aproximados das últimas `janela_quantis` leituras
+#     (entre 1 e 2 janelas), sem guardar a série;
+#   - CUSUM: mudança de patamar (level shift).
+# Leituras com ds anterior à última já processada do site são ignoradas; na
+# mesma ds (o S5P entrega vários grânulos por data) só se ignora valor repetido.
+# Assim retomar com --estado sobre o mesmo arquivo não reemite alertas.
+
+
+class QuantilP2:
+    """Estimador P² (Jain & Chlamtac, 1985): um quantil com 5 marcadores, memória O(1)."""
+
+    def __init__(self, p):
+        self.p = p
+        self.n = 0
+        self.q = []                                   # alturas dos marcadores
+        self.pos = [1, 2, 3, 4, 5]                    # posições reais
+        self.desejada = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.incremento = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def atualizar(self, x):
+        self.n += 1
+        if self.n <= 5:
+            self.q.append(x)
+            self.q.sort()
+            return
+
+        if x < self.q[0]:
+            self.q[0] = x
+            k = 0
+        elif x >= self.q[4]:
+            self.q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if self.q[i] <= x < self.q[i + 1])
+
+        for i in range(k + 1, 5):
+            self.pos[i] += 1
+        for i in range(5):
+            self.desejada[i] += self.incremento[i]
+
+        for i in range(1, 4):
+            d = self.desejada[i] - self.pos[i]
+            if (d >= 1 and self.pos[i + 1] - self.pos[i] > 1) or (d <= -1 and self.pos[i - 1] - self.pos[i] < -1):
+                d = 1 if d > 0 else -1
+                candidato = self._parabolico(i, d)
+                if not self.q[i - 1] < candidato < self.q[i + 1]:
+                    candidato = self.q[i] + d * (self.q[i + d] - self.q[i]) / (self.pos[i + d] - self.pos[i])
+                self.q[i] = candidato
+                self.pos[i] += d
+
+    def _parabolico(self, i, d):
+        q, n = self.q, self.pos
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def valor(self):
+        if not self.q:
+            return math.nan
+        if self.n <= 5:
+            return self.q[min(int(round(self.p * (len(self.q) - 1))), len(self.q) - 1)]
+        return self.q[2]
+
+
+class QuantilJanela:
+    """
+    Quantil P² das leituras recentes: dois estimadores defasados de `janela` leituras;
+    quando o mais novo completa a janela, ele assume e outro começa. O valor cobre
+    sempre entre `janela` e 2 * `janela` leituras (no início, todas), com memória O(1).
+    """
+
+    def __init__(self, p, janela):
+        self.p = p
+        self.janela = janela
+        self.atual = QuantilP2(p)
+        self.proximo = None
+
+    def atualizar(self, x):
+        self.atual.atualizar(x)
+        if self.proximo is not None:
+            self.proximo.atualizar(x)
+            if self.proximo.n >= self.janela:
+                self.atual, self.proximo = self.proximo, QuantilP2(self.p)
+        elif self.atual.n >= self.janela:
+            self.proximo = QuantilP2(self.p)
+
+    def valor(self):
+        return self.atual.valor()
+
+
+class EstatisticasSite:
+    """Estado incremental de um site (ou site + poluente)."""
+
+    def __init__(self, alfa=0.1, z_pico=4.0, cusum_k=0.5, cusum_h=10.0, aquecimento=48, janela_quantis=720):
+        self.alfa = alfa
+        self.z_pico = z_pico
+        self.cusum_k = cusum_k
+        self.cusum_h = cusum_h
+        self.aquecimento = aquecimento
+        self.janela_quantis = janela_quantis  # 720 leituras: 30 dias da OWM horária, ~2 anos do S5P diário
+        # Welford (regime atual)
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        # EWMA
+        self.ewma = None
+        self.ewmvar = 0.0
+        # Quantis aproximados (janela móvel)
+        self.q01 = QuantilJanela(0.01, janela_quantis)
+        self.q99 = QuantilJanela(0.99, janela_quantis)
+        # CUSUM
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.ultima_ds = None
+        self.valores_ultima_ds = set()  # leituras já vistas na ultima_ds (grânulos da mesma data)
+
+    @property
+    def desvio(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    def atualizar(self, ds, valor):
+        """Incorpora uma leitura e devolve a lista de alertas (dicts) que ela disparou."""
+        alertas = []
+        if ds != self.ultima_ds:
+            self.ultima_ds = ds
+            self.valores_ultima_ds = set()
+        self.valores_ultima_ds.add(valor)
+        aquecido = self.n >= self.aquecimento
+
+        if aquecido:
+            # Pico: distância ao nível recente, em desvios EWMA, e fora da faixa 1%-99%
+            desvio_ewm = math.sqrt(self.ewmvar)
+            z = (valor - self.ewma) / desvio_ewm if desvio_ewm > 0 else 0.0
+            fora_faixa = valor > self.q99.valor() or valor < self.q01.valor()
+            if abs(z) >= self.z_pico and fora_faixa:
+                alertas.append({'ds': ds, 'valor': valor, 'tipo': 'pico_alta' if z > 0 else 'pico_baixa',
+                                'escore': z, 'referencia': self.ewma})
+
+            # Mudança de patamar: CUSUM sobre o valor padronizado pelo regime atual
+            if self.desvio > 0:
+                z_regime = (valor - self.media) / self.desvio
+                self.cusum_pos = max(0.0, self.cusum_pos + z_regime - self.cusum_k)
+                self.cusum_neg = max(0.0, self.cusum_neg - z_regime - self.cusum_k)
+                if self.cusum_pos > self.cusum_h or self.cusum_neg > self.cusum_h:
+                    alertas.append({'ds': ds, 'valor': valor,
+                                    'tipo': 'patamar_alta' if self.cusum_pos > self.cusum_h else 'patamar_baixa',
+                                    'escore': max(self.cusum_pos, self.cusum_neg), 'referencia': self.media})
+                    self._novo_regime()
+
+        # Welford
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+
+        # EWMA (nível e variância)
+        if self.ewma is None:
+            self.ewma = valor
+        else:
+            diff = valor - self.ewma
+            incremento = self.alfa * diff
+            self.ewma += incremento
+            self.ewmvar = (1 - self.alfa) * (self.ewmvar + diff * incremento)
+
+        self.q01.atualizar(valor)
+        self.q99.atualizar(valor)
+        return alertas
+
+    def _novo_regime(self):
+        """Após uma mudança de patamar, a referência recomeça (o EWMA segue acompanhando)."""
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.cusum_pos = 0.0
+        self.cusum_neg = 0.0
+        self.q01 = QuantilJanela(0.01, self.janela_quantis)
+        self.q99 = QuantilJanela(0.99, self.janela_quantis)
+
+
+class DetectorStream:
+    """Detector para centenas de sites: um EstatisticasSite por chave."""
+
+    def __init__(self, **parametros):
+        self.parametros = parametros
+        self.sites = {}
+
+    def processar(self, site, ds, valor):
+        """Alertas da leitura; ignora ds anterior à última do site e (ds, valor) já visto."""
+        if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+            return []
+        estado = self.sites.get(site)
+        if estado is None:
+            estado = self.sites[site] = EstatisticasSite(**self.parametros)
+        elif estado.ultima_ds is not None and (
+                ds < estado.ultima_ds or (ds == estado.ultima_ds and float(valor) in estado.valores_ultima_ds)):
+            return []
+        alertas = estado.atualizar(ds, float(valor))
+        for alerta in alertas:
+            alerta['site'] = site
+        return alertas
+
+    def processar_lote(self, df, col_site='site', col_ds='ds', col_valor='y'):
+        """Processa um bloco de leituras novas (em ordem de chegada) e devolve os alertas."""
+        alertas = []
+        for site, ds, valor in zip(df[col_site], df[col_ds], df[col_valor]):
+            alertas.extend(self.processar(site, ds, valor))
+        return pd.DataFrame(alertas, columns=['site', 'ds', 'valor', 'tipo', 'escore', 'referencia'])
+
+    def salvar(self, caminho):
+        with open(caminho, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def carregar(caminho):
+        with open(caminho, 'rb') as f:
+            return pickle.load(f)
+
+
+# --- EXECUÇÃO (ARQUIVO HORÁRIO DA OWM) ---
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detector online de anomalias sobre leituras horárias")
+    parser.add_argument('arquivo', nargs='?', default="historico_poluicao.csv")
+    parser.add_argument('--site', default='local')
+    parser.add_argument('--estado', help="arquivo .pkl para retomar/salvar o estado do detector")
+    args = parser.parse_args()
+
+    poluentes = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+    try:
+        detector = DetectorStream.carregar(args.estado) if args.estado else DetectorStream()
+    except FileNotFoundError:
+        detector = DetectorStream()
+
+    total = 0
+    # Lido em blocos: simula a chegada contínua de leituras
+    for bloco in pd.read_csv(args.arquivo, chunksize=24 * 7, parse_dates=['data_hora']):
+        for poluente in poluentes:
+            if poluente not in bloco:
+                continue
+            lote = pd.DataFrame({'site': f"{args.site}/{poluente}", 'ds': bloco['data_hora'], 'y': bloco[poluente]})
+            alertas = detector.processar_lote(lote)
+            total += len(alertas)
+            for a in alertas.itertuples():
+                print(f"🚨 {a.ds} {a.site}: {a.tipo} (valor={a.valor:.2f}, escore={a.escore:.1f})")
+
+    print(f"✅ {total} alertas em {len(detector.sites)} séries.")
+    if args.estado:
+        detector.salvar(args.estado)
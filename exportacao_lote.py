@@ -0,0 +1,153 @@
+import argparse
+import csv
+import gzip
+import io
+import zipfile
+import zlib
+
+import pandas as pd
+
+import artefatos
+import dados_satelite
+
+# --- EXPORTAÇÃO EM LOTE DOS DOSSIÊS ---
+# O app só exporta um site por vez (st.download_button com to_csv do forecast
+# inteiro em memória). Aqui os dossiês de muitos sites/gases saem por um
+# gerador de linhas direto para CSV comprimido, Parquet ou ZIP (um CSV por
+# site/gás): só um site fica em memória por vez, não importa quantos sejam.
+#
+# Exemplos:
+#   python exportacao_lote.py dossies.csv.gz                       (todos os artefatos)
+#   python exportacao_lote.py dossies.parquet --watchlist watchlist.csv
+#   python exportacao_lote.py dossies.zip --gases NO2,CH4 --ao-vivo
+
+COLUNAS = ['site', 'gas', 'lat', 'lon', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+# --- 1. ORIGEM DOS SITES ---
+def sites_dos_artefatos(gases=None):
+    for meta in artefatos.listar():
+        if gases and meta['gas'] not in gases:
+            continue
+        yield {'site': meta.get('site', ''), 'gas': meta['gas'], 'lat': meta['lat'], 'lon': meta['lon']}
+
+
+def sites_da_watchlist(caminho, gases=None):
+    for bloco in pd.read_csv(caminho, chunksize=1000):
+        for linha in bloco.to_dict('records'):
+            gas = dados_satelite.chave_gas(linha['gas'])
+            if gases and gas not in gases:
+                continue
+            yield {'site': linha['site'], 'gas': gas, 'lat': float(linha['lat']), 'lon': float(linha['lon'])}
+
+
+def previsao_do_site(site, ao_vivo=False):
+    """Previsão do artefato pré-calculado; com `ao_vivo`, calcula se não houver artefato."""
+    artefato = artefatos.carregar(site['gas'], site['lat'], site['lon'])
+    if artefato is not None:
+        return artefato['previsao']
+    if not ao_vivo:
+        return None
+    df, _ = dados_satelite.get_data(site['lat'], site['lon'], site['gas'])
+    if df.empty or len(df) < 5:
+        return None
+    return dados_satelite.run_forecast(df, site['gas'], site['lat'], site['lon'])[artefatos.COLUNAS_PREVISAO]
+
+
+# --- 2. GERADORES DE LINHAS ---
+def dossies(sites, ao_vivo=False):
+    """Gera (site, previsão) um por vez; sites sem dados são pulados com aviso."""
+    for site in sites:
+        previsao = previsao_do_site(site, ao_vivo)
+        if previsao is None:
+            print(f"⚠️ Sem dossiê para {site['site']} ({site['gas']}).")
+            continue
+        yield site, previsao
+
+
+def linhas(sites, ao_vivo=False):
+    for site, previsao in dossies(sites, ao_vivo):
+        datas = previsao['ds'].dt.strftime('%Y-%m-%d')
+        for ds, yhat, inferior, superior in zip(datas, previsao['yhat'], previsao['yhat_lower'], previsao['yhat_upper']):
+            yield (site['site'], site['gas'], site['lat'], site['lon'], ds, yhat, inferior, superior)
+
+
+# --- 3. ESCRITORES (MEMÓRIA CONSTANTE) ---
+def escrever_csv_gz(fluxo_linhas, destino):
+    """`destino`: caminho ou objeto binário gravável."""
+    with gzip.open(destino, 'wt', newline='', encoding='utf-8') as f:
+        escritor = csv.writer(f)
+        escritor.writerow(COLUNAS)
+        escritor.writerows(fluxo_linhas)
+
+
+def escrever_parquet(fluxo_linhas, destino, tamanho_lote=50_000):
+    """Grava em row groups de `tamanho_lote` linhas."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = pa.schema([
+        ('site', pa.string()), ('gas', pa.string()), ('lat', pa.float64()), ('lon', pa.float64()),
+        ('ds', pa.string()), ('yhat', pa.float64()), ('yhat_lower', pa.float64()), ('yhat_upper', pa.float64()),
+    ])
+    with pq.ParquetWriter(destino, esquema, compression='zstd') as escritor:
+        lote = []
+        for linha in fluxo_linhas:
+            lote.append(linha)
+            if len(lote) >= tamanho_lote:
+                escritor.write_table(pa.Table.from_pylist([dict(zip(COLUNAS, l)) for l in lote], esquema))
+                lote = []
+        if lote:
+            escritor.write_table(pa.Table.from_pylist([dict(zip(COLUNAS, l)) for l in lote], esquema))
+
+
+def escrever_zip(fluxo_dossies, destino):
+    """Um CSV por site/gás dentro do ZIP; funciona também em streams sem seek (HTTP)."""
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for site, previsao in fluxo_dossies:
+            nome = f"carbon_report_{site['site']}_{site['gas']}_{site['lat']}_{site['lon']}.csv"
+            with zf.open(nome, 'w') as bruto, io.TextIOWrapper(bruto, encoding='utf-8', newline='') as f:
+                previsao.to_csv(f, index=False)
+
+
+def blocos_csv_gz(fluxo_linhas, tamanho_bloco=64 * 1024):
+    """Gera bytes gzip em blocos (para resposta HTTP sem montar o arquivo inteiro)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = cabeçalho gzip
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS)
+    for linha in fluxo_linhas:
+        escritor.writerow(linha)
+        if buffer.tell() >= tamanho_bloco:
+            saida = compressor.compress(buffer.getvalue().encode('utf-8'))
+            buffer.seek(0)
+            buffer.truncate()
+            if saida:
+                yield saida
+    yield compressor.compress(buffer.getvalue().encode('utf-8')) + compressor.flush()
+
+
+def exportar(destino, sites, ao_vivo=False):
+    """Escolhe o formato pela extensão: .csv.gz, .parquet ou .zip."""
+    if destino.endswith('.zip'):
+        escrever_zip(dossies(sites, ao_vivo), destino)
+    elif destino.endswith('.parquet'):
+        escrever_parquet(linhas(sites, ao_vivo), destino)
+    elif destino.endswith('.csv.gz'):
+        escrever_csv_gz(linhas(sites, ao_vivo), destino)
+    else:
+        raise ValueError("Use .csv.gz, .parquet ou .zip no nome do arquivo de saída.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exportação em lote dos dossiês de previsão")
+    parser.add_argument('saida', help="arquivo .csv.gz, .parquet ou .zip")
+    parser.add_argument('--watchlist', help="CSV com site,gas,lat,lon (padrão: todos os artefatos)")
+    parser.add_argument('--gases', help="filtra gases, ex: NO2,CH4")
+    parser.add_argument('--ao-vivo', action='store_true', help="calcula na hora os sites sem artefato")
+    args = parser.parse_args()
+
+    gases = set(args.gases.split(',')) if args.gases else None
+    sites = sites_da_watchlist(args.watchlist, gases) if args.watchlist else sites_dos_artefatos(gases)
+    exportar(args.saida, sites, args.ao_vivo)
+    print(f"💾 Dossiês exportados em '{args.saida}'")
@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import dados_satelite
+from inicializacao import obter_ee
+
+# --- EXTRAÇÃO PROGRESSIVA (GROSSO -> FINO) ---
+# A extração completa do get_data reduz até 1000 imagens diárias numa chamada
+# bloqueante. Para coordenadas novas, primeiro sai uma resposta grosseira e
+# rápida (compostos mensais, escala 3x maior: ~36 reduções em vez de ~1000),
+# que já alimenta o gauge e a tendência; a série completa substitui depois.
+# A extração completa começa em segundo plano antes da grosseira, então a
+# prévia é desenhada enquanto ela roda (o tempo total é o da completa).
+
+FATOR_ESCALA = 3
+
+
+def _meses_no_periodo():
+    inicio, fim = pd.Timestamp(dados_satelite.DATA_INICIO), pd.Timestamp(dados_satelite.DATA_FIM)
+    return (fim.year - inicio.year) * 12 + (fim.month - inicio.month)
+
+
+def get_data_grosseira(lat, lon, gas_type, fator=FATOR_ESCALA):
+    """Médias mensais em escala `fator` vezes maior. Mesmo formato de retorno do get_data."""
+    chave = dados_satelite.chave_gas(gas_type)
+    if chave is None:
+        return pd.DataFrame(), None
+
+    ee = obter_ee()
+    cfg = dados_satelite.GASES[chave]
+    ponto = ee.Geometry.Point([lon, lat])
+    collection = (ee.ImageCollection(cfg['col_id'])
+                  .filterBounds(ponto)
+                  .filterDate(dados_satelite.DATA_INICIO, dados_satelite.DATA_FIM)
+                  .select(cfg['band']))
+    inicio = ee.Date(dados_satelite.DATA_INICIO)
+
+    def mensal(m):
+        ini = inicio.advance(m, 'month')
+        do_mes = collection.filterDate(ini, ini.advance(1, 'month'))
+        # Mês sem imagem: o mean() sai sem bandas e o .get da banda quebraria a chamada
+        # inteira; vira nulo (como pixel mascarado) e sai no notNull abaixo.
+        val = ee.Algorithms.If(
+            do_mes.size().gt(0),
+            do_mes.mean().reduceRegion(ee.Reducer.mean(), ponto, cfg['scale'] * fator).get(cfg['band']),
+            None)
+        return ee.Feature(None, {'ds': ini.format("YYYY-MM-dd"), 'y': val})
+
+    meses = ee.FeatureCollection(ee.List.sequence(0, _meses_no_periodo() - 1).map(mensal))
+    data = (meses.filter(ee.Filter.notNull(['y']))
+            .reduceColumns(ee.Reducer.toList(2), ['ds', 'y']).get('list').getInfo())
+
+    df = pd.DataFrame(data, columns=['ds', 'y'])
+    if not df.empty:
+        df['ds'] = pd.to_datetime(df['ds'])
+        df = df.sort_values('ds')
+    return df, cfg['band']
+
+
+def tendencia_preliminar(df, dias_futuro=730):
+    """
+    Reta ajustada às médias mensais: (valor atual, valor em `dias_futuro`, delta %).
+    Mesmas métricas do painel do app, sem esperar o Prophet.
+    """
+    x = (df['ds'] - df['ds'].min()).dt.days.to_numpy(dtype='float64')
+    y = df['y'].to_numpy(dtype='float64')
+    inclinacao, intercepto = np.polyfit(x, y, 1)
+    valor_hoje = intercepto + inclinacao * x[-1]
+    valor_futuro = intercepto + inclinacao * (x[-1] + dias_futuro)
+    delta = ((valor_futuro - valor_hoje) / valor_hoje) * 100 if valor_hoje else 0.0
+    return valor_hoje, valor_futuro, delta
+
+
+def extrair_progressivo(lat, lon, gas_type, buscar_completo=None, buscar_grosso=None):
+    """
+    Gera ('grosso', df, band) e depois ('completo', df, band).
+    `buscar_completo` roda numa thread desde o início; se a prévia falhar, sai vazia.
+    """
+    buscar_completo = buscar_completo or dados_satelite.get_data
+    buscar_grosso = buscar_grosso or get_data_grosseira
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        completo = executor.submit(buscar_completo, lat, lon, gas_type)
+        try:
+            df, band = buscar_grosso(lat, lon, gas_type)
+        except Exception:
+            df, band = pd.DataFrame(columns=['ds', 'y']), None  # a prévia é opcional; a completa segue
+        yield 'grosso', df, band
+        df, band = completo.result()
+        yield 'completo', df, band
@@ -0,0 +1,251 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import cache_espacial
+import dados_satelite
+
+# --- FUSÃO TEMPORAL: ESTAÇÕES HORÁRIAS (OWM) x SÉRIE DIÁRIA DO SATÉLITE ---
+# O histórico horário do OpenWeatherMap (historico_poluicao.csv, do
+# legado_coleta_poluicao.py) e a série diária do Sentinel-5P (get_data) viviam
+# separados. Aqui as duas fontes são alinhadas por chaves de tempo ordenadas,
+# para muitas estações de uma vez, e viram uma tabela conjunta para calibração
+# (ex: NO2 em µg/m³ no solo x densidade de coluna do satélite).
+#
+# Três formas de alinhar cada dia do satélite com o solo:
+#   'janela': média das leituras em [passagem - antes, passagem + depois]
+#   'asof':   a leitura mais próxima da passagem (merge_asof, com tolerância)
+#   'diario': média diária do solo (lida em blocos, sem carregar o horário)
+#
+# Exemplos:
+#   python fusao_temporal.py historico_poluicao.csv --lat -23.5505 --lon -46.6333 --gas NO2
+#   python fusao_temporal.py --estacoes estacoes.csv --gas NO2 --modo asof --fake
+# estacoes.csv: colunas estacao,arquivo,lat,lon
+
+POLUENTES_OWM = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+POLUENTE_DO_GAS = {'NO2': 'no2', 'CO': 'co', 'SO2': 'so2'}  # CH4 não existe no OWM
+HORA_PASSAGEM = '13:30'  # passagem do Sentinel-5P (hora solar local)
+TAMANHO_BLOCO = 100_000
+
+
+# --- 1. LEITURA DAS ESTAÇÕES (EM BLOCOS, FLOAT32, ESTAÇÃO CATEGÓRICA) ---
+def _blocos(caminho, colunas, tamanho_bloco):
+    return pd.read_csv(caminho, usecols=['data_hora', *colunas], parse_dates=['data_hora'],
+                       dtype={c: 'float32' for c in colunas}, chunksize=tamanho_bloco)
+
+
+def ler_estacoes(arquivos, colunas=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    arquivos: {estacao: caminho do CSV horário}.
+    Devolve a tabela longa (estacao, data_hora, poluentes) ordenada por estação e tempo.
+    """
+    colunas = colunas or POLUENTES_OWM
+    categorias = pd.CategoricalDtype(list(arquivos))
+    partes = []
+    for estacao, caminho in arquivos.items():
+        df = pd.concat(_blocos(caminho, colunas, tamanho_bloco), ignore_index=True)
+        df['data_hora'] = df['data_hora'].astype('datetime64[ns]')
+        df.insert(0, 'estacao', pd.Categorical([estacao] * len(df), dtype=categorias))
+        partes.append(df.sort_values('data_hora', kind='stable'))
+    return pd.concat(partes, ignore_index=True)
+
+
+def resumir_em_blocos(arquivos, freq='D', colunas=None, tamanho_bloco=TAMANHO_BLOCO):
+    """
+    Média por período `freq` sem manter o horário em memória: cada bloco vira
+    somas e contagens por período, combinadas no fim (blocos podem cortar um dia ao meio).
+    """
+    colunas = colunas or POLUENTES_OWM
+    partes = []
+    for estacao, caminho in arquivos.items():
+        somas, contagens = [], []
+        for bloco in _blocos(caminho, colunas, tamanho_bloco):
+            grupos = bloco.set_index('data_hora')[colunas].astype('float64').resample(freq)
+            somas.append(grupos.sum())
+            contagens.append(grupos.count())
+        soma = pd.concat(somas).groupby(level=0).sum()
+        contagem = pd.concat(contagens).groupby(level=0).sum()
+        media = (soma / contagem.where(contagem > 0)).astype('float32')
+        media.index.name = 'ds'
+        partes.append(media.reset_index().assign(estacao=estacao))
+    df = pd.concat(partes, ignore_index=True)
+    df['estacao'] = pd.Categorical(df['estacao'], categories=list(arquivos))
+    return df[['estacao', 'ds', *colunas]]
+
+
+def reamostrar(terra, freq='D', colunas=None):
+    """Tabela longa horária -> média por estação na grade comum `freq` (coluna de tempo 'ds')."""
+    colunas = colunas or [c for c in terra.columns if c not in ('estacao', 'data_hora')]
+    return (terra.groupby(['estacao', pd.Grouper(key='data_hora', freq=freq)], observed=True)[colunas]
+            .mean().reset_index().rename(columns={'data_hora': 'ds'}))
+
+
+def series_satelite(series, categorias=None, coluna='y'):
+    """{estacao: DataFrame(ds, y)} -> tabela longa (estacao, ds, satelite) em float32."""
+    categorias = categorias or list(series)
+    partes = [pd.DataFrame({'estacao': estacao, 'ds': pd.to_datetime(df['ds']).to_numpy(),
+                            'satelite': df[coluna].to_numpy(dtype='float32')})
+              for estacao, df in series.items() if df is not None and not df.empty]
+    if not partes:
+        return pd.DataFrame({'estacao': pd.Categorical([], categories=categorias),
+                             'ds': pd.Series(dtype='datetime64[ns]'), 'satelite': pd.Series(dtype='float32')})
+    df = pd.concat(partes, ignore_index=True)
+    df['estacao'] = pd.Categorical(df['estacao'], categories=categorias)
+    return df.sort_values(['estacao', 'ds'], kind='stable').reset_index(drop=True)
+
+
+# --- 2. JUNÇÕES POR TEMPO ---
+def _estacao_comum(terra, satelite):
+    """Mesmo conjunto de categorias de 'estacao' nos dois lados (o satélite pode cobrir só parte das estações)."""
+    def _nomes(df):
+        coluna = df['estacao']
+        return list(coluna.cat.categories) if isinstance(coluna.dtype, pd.CategoricalDtype) else list(coluna.unique())
+
+    categorias = pd.CategoricalDtype(list(dict.fromkeys(_nomes(terra) + _nomes(satelite))))
+    return terra.astype({'estacao': categorias}), satelite.astype({'estacao': categorias})
+
+
+def _passagem(satelite, hora_passagem):
+    return satelite['ds'].dt.normalize() + pd.Timedelta(f"{hora_passagem}:00")
+
+
+def juntar_asof(terra, satelite, poluente, tolerancia='2h', hora_passagem=HORA_PASSAGEM, direcao='nearest'):
+    """Para cada dia do satélite, a leitura da estação mais próxima do horário da passagem."""
+    terra, satelite = _estacao_comum(terra, satelite)
+    # merge_asof exige as chaves de tempo ordenadas e na mesma resolução
+    alvo = (satelite.assign(passagem=_passagem(satelite, hora_passagem).astype('datetime64[ns]'))
+            .sort_values('passagem', kind='stable'))
+    leituras = (terra[['estacao', 'data_hora', poluente]].dropna(subset=[poluente])
+                .astype({'data_hora': 'datetime64[ns]'}).sort_values('data_hora', kind='stable'))
+    junto = pd.merge_asof(alvo, leituras, left_on='passagem', right_on='data_hora', by='estacao',
+                          tolerance=pd.Timedelta(tolerancia), direction=direcao)
+    junto = junto.rename(columns={poluente: 'terra'}).drop(columns=['passagem', 'data_hora'])
+    junto['n_leituras'] = junto['terra'].notna().astype('int32')
+    return junto.sort_values(['estacao', 'ds'], kind='stable').reset_index(drop=True)
+
+
+def juntar_janela(terra, satelite, poluente, antes='2h', depois='2h', hora_passagem=HORA_PASSAGEM):
+    """
+    Média das leituras da estação em [passagem - antes, passagem + depois].
+    Por estação: busca binária (searchsorted) nos tempos ordenados + somas acumuladas,
+    O(n log n) sem produto cartesiano.
+    """
+    antes, depois = pd.Timedelta(antes).value, pd.Timedelta(depois).value
+    partes = []
+    leituras_por_estacao = dict(tuple(terra.groupby('estacao', observed=True)))
+    for estacao, dias in satelite.groupby('estacao', observed=True):
+        leituras = leituras_por_estacao.get(estacao)
+        media = np.full(len(dias), np.nan)
+        n = np.zeros(len(dias), dtype='int64')
+        if leituras is not None and not leituras.empty:
+            tempos = leituras['data_hora'].to_numpy(dtype='datetime64[ns]').view('int64')
+            valores = leituras[poluente].to_numpy(dtype='float64')
+            validos = ~np.isnan(valores)
+            soma_acum = np.concatenate([[0.0], np.cumsum(np.where(validos, valores, 0.0))])
+            n_acum = np.concatenate([[0], np.cumsum(validos)])
+
+            alvo = _passagem(dias, hora_passagem).to_numpy(dtype='datetime64[ns]').view('int64')
+            i = np.searchsorted(tempos, alvo - antes, side='left')
+            j = np.searchsorted(tempos, alvo + depois, side='right')
+            n = n_acum[j] - n_acum[i]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                media = np.where(n > 0, (soma_acum[j] - soma_acum[i]) / n, np.nan)
+        partes.append(dias.assign(terra=media.astype('float32'), n_leituras=n.astype('int32')))
+    if not partes:
+        return satelite.assign(terra=pd.Series(dtype='float32'), n_leituras=pd.Series(dtype='int32'))
+    return pd.concat(partes, ignore_index=True)
+
+
+def juntar_diario(terra_diaria, satelite, poluente):
+    """Junção exata (estacao, dia) com a média diária do solo (ver resumir_em_blocos/reamostrar)."""
+    terra_diaria, satelite = _estacao_comum(terra_diaria, satelite)
+    diario = terra_diaria[['estacao', 'ds', poluente]].rename(columns={poluente: 'terra'})
+    junto = satelite.merge(diario, on=['estacao', 'ds'], how='left')
+    junto['n_leituras'] = junto['terra'].notna().astype('int32')
+    return junto
+
+
+# --- 3. TABELA CONJUNTA E CALIBRAÇÃO ---
+def tabela_calibracao(terra, satelite, poluente='no2', modo='janela', **opcoes):
+    """
+    terra: horária (ler_estacoes) nos modos 'janela'/'asof'; diária (resumir_em_blocos) no 'diario'.
+    satelite: tabela longa (series_satelite). Só ficam os dias com as duas fontes.
+    """
+    if modo == 'janela':
+        junto = juntar_janela(terra, satelite, poluente, **opcoes)
+    elif modo == 'asof':
+        junto = juntar_asof(terra, satelite, poluente, **opcoes)
+    elif modo == 'diario':
+        junto = juntar_diario(terra, satelite, poluente)
+    else:
+        raise ValueError(f"Modo desconhecido: {modo} (use janela, asof ou diario)")
+    junto = junto.dropna(subset=['terra', 'satelite'])
+    return junto[['estacao', 'ds', 'satelite', 'terra', 'n_leituras']].reset_index(drop=True)
+
+
+def ajustar_calibracao(tabela, min_pares=30):
+    """Regressão linear terra = intercepto + inclinacao * satelite, por estação."""
+    x = tabela['satelite'].astype('float64')
+    y = tabela['terra'].astype('float64')
+    somas = pd.DataFrame({'estacao': tabela['estacao'], 'x': x, 'y': y, 'xx': x * x, 'yy': y * y, 'xy': x * y})
+    g = somas.groupby('estacao', observed=True)
+    agregado = g[['x', 'y', 'xx', 'yy', 'xy']].sum()
+    n = g.size()
+
+    sxx = agregado['xx'] - agregado['x'] ** 2 / n
+    syy = agregado['yy'] - agregado['y'] ** 2 / n
+    sxy = agregado['xy'] - agregado['x'] * agregado['y'] / n
+    inclinacao = sxy / sxx.where(sxx > 0)
+    resultado = pd.DataFrame({
+        'n_pares': n,
+        'inclinacao': inclinacao,
+        'intercepto': (agregado['y'] - inclinacao * agregado['x']) / n,
+        'r': sxy / np.sqrt((sxx * syy).where(sxx * syy > 0)),
+    })
+    resultado.loc[resultado['n_pares'] < min_pares, ['inclinacao', 'intercepto', 'r']] = np.nan
+    return resultado.reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fusão do histórico horário das estações com a série diária do satélite")
+    parser.add_argument('arquivo', nargs='?', default="historico_poluicao.csv", help="CSV horário de uma estação")
+    parser.add_argument('--lat', type=float, default=-23.5505)
+    parser.add_argument('--lon', type=float, default=-46.6333)
+    parser.add_argument('--estacoes', help="CSV com estacao,arquivo,lat,lon (várias estações)")
+    parser.add_argument('--gas', default='NO2', help="NO2, CO ou SO2")
+    parser.add_argument('--modo', default='janela', choices=['janela', 'asof', 'diario'])
+    parser.add_argument('--fake', action='store_true', help="usa a fonte sintética (sem Earth Engine)")
+    parser.add_argument('--saida', help="CSV para salvar a tabela conjunta")
+    args = parser.parse_args()
+
+    gas = dados_satelite.chave_gas(args.gas)
+    if gas not in POLUENTE_DO_GAS:
+        parser.error(f"Sem poluente equivalente no OWM para {args.gas}.")
+    poluente = POLUENTE_DO_GAS[gas]
+
+    if args.estacoes:
+        estacoes = pd.read_csv(args.estacoes)
+    else:
+        estacoes = pd.DataFrame([{'estacao': 'local', 'arquivo': args.arquivo, 'lat': args.lat, 'lon': args.lon}])
+    arquivos = dict(zip(estacoes['estacao'], estacoes['arquivo']))
+
+    buscar = None
+    if args.fake:
+        from api_servico import FonteFake
+        buscar = FonteFake().get_data
+    series = {linha.estacao: cache_espacial.get_data(linha.lat, linha.lon, gas, buscar=buscar)[0]
+              for linha in estacoes.itertuples()}
+    satelite = series_satelite(series, categorias=list(arquivos))
+
+    if args.modo == 'diario':
+        terra = resumir_em_blocos(arquivos, 'D', [poluente])
+    else:
+        terra = ler_estacoes(arquivos, [poluente])
+    tabela = tabela_calibracao(terra, satelite, poluente, args.modo)
+
+    print(f"🔗 {len(tabela)} dias com solo e satélite em {tabela['estacao'].nunique()} estações.")
+    print(ajustar_calibracao(tabela).to_string(index=False))
+    if args.saida:
+        tabela.to_csv(args.saida, index=False)
+        print(f"💾 Tabela conjunta salva em '{args.saida}'")
@@ -1,16 +1,12 @@
-import ee
 import pandas as pd
-import matplotlib.pyplot as plt
 
-# Inicializa
-try:
-    ee.Initialize()
-except:
-    ee.Authenticate()
-    ee.Initialize()
+from inicializacao import obter_ee
+
+# Inicializa (só no primeiro uso, não na importação)
 
 def extrair_serie_temporal(lat, lon):
     print(f"📊 Extraindo histórico detalhado para Lat: {lat}, Lon: {lon}...")
+    ee = obter_ee(timeout=None, interativo=True)
     
     ponto = ee.Geometry.Point([lon, lat])
 
@@ -62,26 +58,28 @@ def extrair_serie_temporal(lat, lon):
     return df
 
 # --- Execução ---
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-df_resultado = extrair_serie_temporal(-23.5505, -46.6333)
+    df_resultado = extrair_serie_temporal(-23.5505, -46.6333)
 
-if not df_resultado.empty:
-    print(f"✅ Dados extraídos com sucesso: {len(df_resultado)} registros.")
-    print(df_resultado.head()) 
+    if not df_resultado.empty:
+        print(f"✅ Dados extraídos com sucesso: {len(df_resultado)} registros.")
+        print(df_resultado.head()) 
 
-    # Gerar o Gráfico
-    plt.figure(figsize=(12, 6))
-    plt.plot(df_resultado['Data'], df_resultado['NO2'], color='purple', linewidth=1, label='NO2 (Sentinel-5P)')
+        # Gerar o Gráfico
+        plt.figure(figsize=(12, 6))
+        plt.plot(df_resultado['Data'], df_resultado['NO2'], color='purple', linewidth=1, label='NO2 (Sentinel-5P)')
     
-    # Adicionando uma média móvel para suavizar o visual (fica mais profissional)
-    df_resultado['Media_Movel'] = df_resultado['NO2'].rolling(window=7).mean()
-    plt.plot(df_resultado['Data'], df_resultado['Media_Movel'], color='orange', linewidth=2, label='Média Móvel (7 dias)')
+        # Adicionando uma média móvel para suavizar o visual (fica mais profissional)
+        df_resultado['Media_Movel'] = df_resultado['NO2'].rolling(window=7).mean()
+        plt.plot(df_resultado['Data'], df_resultado['Media_Movel'], color='orange', linewidth=2, label='Média Móvel (7 dias)')
 
-    plt.title('Histórico de Poluição (NO2) - São Paulo (2023-2025)')
-    plt.xlabel('Data')
-    plt.ylabel('Concentração (mol/m²)')
-    plt.grid(True, alpha=0.3)
-    plt.legend()
-    plt.show()
-else:
-    print("Erro: DataFrame vazio.")
\ No newline at end of file
+        plt.title('Histórico de Poluição (NO2) - São Paulo (2023-2025)')
+        plt.xlabel('Data')
+        plt.ylabel('Concentração (mol/m²)')
+        plt.grid(True, alpha=0.3)
+        plt.legend()
+        plt.show()
+    else:
+        print("Erro: DataFrame vazio.")
\ No newline at end of file
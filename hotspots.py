@@ -0,0 +1,159 @@
+import argparse
+import datetime
+import hashlib
+import json
+import math
+import os
+import time
+
+import pandas as pd
+
+import cache_espacial
+import cache_memoria
+import dados_satelite
+from inicializacao import obter_ee
+
+# --- VARREDURA DE HOTSPOTS (TOP-N EMISSORES NUMA CAIXA) ---
+# Em vez de clicar no mapa procurando emissores (uma extração completa por
+# clique), calcula o composto do período no servidor, ordena as células lá
+# mesmo e traz só as N maiores — nunca o raster inteiro.
+#
+# A caixa é expandida até a grade do gás (cache_espacial) e o período padrão
+# termina na última imagem da coleção, então caixas quase iguais e dias sem
+# imagem nova reaproveitam o mesmo resultado. No disco, arquivos com mais de
+# TTL_DISCO_H saem e ficam no máximo MAX_ARQUIVOS_DISCO (os mais recentes).
+#
+# Exemplo:
+#   python hotspots.py CH4 -48.5 -25.5 -46.0 -23.0 --n 15
+#   python hotspots.py NO2 -47.2 -24.1 -46.1 -23.2 --inicio 2024-01-01 --fim 2024-06-01
+
+PASTA_CACHE = os.environ.get('CARBONCAST_CACHE_HOTSPOTS', 'cache_hotspots')
+MAX_CELULAS_LADO = 300  # caixas grandes usam escala maior (no máx. ~300 x 300 células)
+TTL_DISCO_H = float(os.environ.get('CARBONCAST_CACHE_HOTSPOTS_H', '168'))
+MAX_ARQUIVOS_DISCO = 500
+_memoria = cache_memoria.CacheOrcado(max_bytes=16 * 1024 * 1024, ttl=None)
+_ultimas = cache_memoria.CacheOrcado(max_bytes=1024 * 1024, ttl=3600)
+
+
+def ultima_imagem(chave_gas):
+    """Data (ISO) da imagem mais recente da coleção do gás; consulta o EE no máximo uma vez por hora."""
+    data = _ultimas.obter(chave_gas)
+    if data is None:
+        ee = obter_ee()
+        hoje = datetime.date.today()
+        colecao = ee.ImageCollection(dados_satelite.GASES[chave_gas]['col_id']).filterDate(
+            (hoje - datetime.timedelta(days=60)).isoformat(), (hoje + datetime.timedelta(days=1)).isoformat())
+        ms = colecao.aggregate_max('system:time_start').getInfo()
+        ultima = datetime.datetime.fromtimestamp(ms / 1000, datetime.timezone.utc).date() if ms else hoje
+        data = _ultimas.guardar(chave_gas, ultima.isoformat())
+    return data
+
+
+def periodo_padrao(chave_gas, dias=30):
+    """Últimos 30 dias como a camada de calor do app, mas até a última imagem do gás (não até hoje)."""
+    fim = datetime.date.fromisoformat(ultima_imagem(chave_gas)) + datetime.timedelta(days=1)
+    return (fim - datetime.timedelta(days=dias)).isoformat(), fim.isoformat()
+
+
+def ajustar_bbox(bbox, chave_gas):
+    """Expande (oeste, sul, leste, norte) até as bordas das células da grade do gás."""
+    lado = cache_espacial.tamanho_celula(chave_gas)
+    oeste, sul, leste, norte = bbox
+    return (round(math.floor(oeste / lado) * lado, 6), round(math.floor(sul / lado) * lado, 6),
+            round(math.ceil(leste / lado) * lado, 6), round(math.ceil(norte / lado) * lado, 6))
+
+
+def _chave(bbox, gas, inicio, fim, top_n):
+    texto = json.dumps([[round(c, 4) for c in bbox], gas, inicio, fim, top_n])
+    return hashlib.sha256(texto.encode()).hexdigest()[:20]
+
+
+def _ler_disco(caminho):
+    """Resultado gravado (ou None se não houver ou tiver passado de TTL_DISCO_H)."""
+    try:
+        if time.time() - os.path.getmtime(caminho) > TTL_DISCO_H * 3600:
+            os.remove(caminho)
+            return None
+        return pd.read_json(caminho, orient='records')
+    except FileNotFoundError:
+        return None
+
+
+def _gravar_disco(caminho, df):
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    df.to_json(temporario, orient='records')
+    os.replace(temporario, caminho)
+
+    arquivos = [os.path.join(PASTA_CACHE, nome) for nome in os.listdir(PASTA_CACHE) if nome.endswith('.json')]
+    if len(arquivos) > MAX_ARQUIVOS_DISCO:
+        arquivos.sort(key=os.path.getmtime)
+        for antigo in arquivos[:len(arquivos) - MAX_ARQUIVOS_DISCO]:
+            try:
+                os.remove(antigo)
+            except FileNotFoundError:
+                pass
+
+
+def _consultar(bbox, chave_gas, inicio, fim, top_n):
+    ee = obter_ee()
+    cfg = dados_satelite.GASES[chave_gas]
+    regiao = ee.Geometry.Rectangle(list(bbox))
+    composto = (ee.ImageCollection(cfg['col_id'])
+                .filterBounds(regiao)
+                .filterDate(inicio, fim)
+                .select(cfg['band'])
+                .mean())
+
+    # Uma amostra por célula na escala do gás; ordenação e corte no servidor
+    lado_m = max(bbox[2] - bbox[0], bbox[3] - bbox[1]) * 111320
+    escala = max(cfg['scale'], lado_m / MAX_CELULAS_LADO)
+    amostras = composto.sample(region=regiao, scale=escala, geometries=True, dropNulls=True, tileScale=4)
+    topo = amostras.sort(cfg['band'], False).limit(top_n).getInfo()
+
+    linhas = []
+    for posicao, feature in enumerate(topo['features'], start=1):
+        lon, lat = feature['geometry']['coordinates']
+        linhas.append({'posicao': posicao, 'lat': lat, 'lon': lon, 'valor': feature['properties'][cfg['band']]})
+    return pd.DataFrame(linhas, columns=['posicao', 'lat', 'lon', 'valor'])
+
+
+def varrer_hotspots(bbox, gas_type, inicio=None, fim=None, top_n=10):
+    """
+    bbox: (oeste, sul, leste, norte) em graus (expandida até a grade do gás).
+    Devolve as `top_n` células com maior média no período, com coordenadas.
+    Resultado em cache (memória + disco) por (bbox ajustada, gás, período, N).
+    """
+    chave_gas = dados_satelite.chave_gas(gas_type)
+    if chave_gas is None:
+        raise ValueError(f"Gás desconhecido: {gas_type}")
+    oeste, sul, leste, norte = (float(c) for c in bbox)
+    if not (oeste < leste and sul < norte):
+        raise ValueError("bbox deve ser (oeste, sul, leste, norte).")
+    caixa = ajustar_bbox((oeste, sul, leste, norte), chave_gas)
+    if inicio is None or fim is None:
+        inicio, fim = periodo_padrao(chave_gas)
+
+    chave = _chave(caixa, chave_gas, inicio, fim, top_n)
+    em_memoria = _memoria.obter(chave)
+    if em_memoria is not None:
+        return em_memoria.copy()
+    caminho = os.path.join(PASTA_CACHE, f"{chave}.json")
+    df = _ler_disco(caminho)
+    if df is None:
+        df = _consultar(caixa, chave_gas, inicio, fim, top_n)
+        _gravar_disco(caminho, df)
+    return _memoria.guardar(chave, df).copy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Top-N hotspots de um gás dentro de uma caixa")
+    parser.add_argument('gas', help="NO2, CH4, CO ou SO2")
+    parser.add_argument('bbox', nargs=4, type=float, metavar=('OESTE', 'SUL', 'LESTE', 'NORTE'))
+    parser.add_argument('--inicio')
+    parser.add_argument('--fim')
+    parser.add_argument('--n', type=int, default=10)
+    args = parser.parse_args()
+
+    resultado = varrer_hotspots(args.bbox, args.gas, args.inicio, args.fim, args.n)
+    print(resultado.to_string(index=False))
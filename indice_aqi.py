@@ -0,0 +1,262 @@
+import argparse
+import math
+
+import numpy as np
+import pandas as pd
+
+# --- ÍNDICE DE QUALIDADE DO AR (VETORIZADO, MULTIPOLUENTE) ---
+# O AQI vinha pronto do OpenWeatherMap ou era inventado no mock com um
+# np.select de cinco faixas só do PM2.5. Aqui cada poluente vira um subíndice
+# por interpolação linear nas tabelas de pontos de corte (busca binária com
+# np.searchsorted sobre arrays, sem laço por linha); o índice final é o maior
+# subíndice e o poluente que o define é o dominante.
+#
+# Normas:
+#   'EPA':    US-EPA (AQI 0-500, PM2.5 com os cortes revisados em 2024)
+#   'CONAMA': Resolução CONAMA 491/2018 + Guia Técnico do MMA (IQAr 0-400, níveis N1-N5)
+#
+# Entradas no esquema do historico_poluicao.csv (OWM): concentrações em µg/m³,
+# colunas pm2_5, pm10, no2, o3, so2, co. Cada poluente usa a média móvel do
+# período da norma (24 h, 8 h ou 1 h) antes do subíndice.
+#
+# Na EPA, O3 e SO2 trocam de período no meio da escala: o O3 de 8 h só vai até
+# 200 ppb (AQI 300) e as faixas altas vêm do O3 de 1 h; o SO2 de 1 h só vai até
+# 304 ppb (AQI 200) e acima disso vale a média de 24 h. Essas tabelas parciais
+# têm None nas faixas que não definem ('coluna' aponta a concentração de origem)
+# e o subíndice do poluente é o maior entre as suas tabelas. Acima de 200 ppb o
+# O3 de 8 h não define índice ('indefinido_acima'); o SO2 de 1 h acima de 304 ppb
+# fica em 200 se a média de 24 h não passar de 304 ppb, como manda a EPA.
+#
+# Exemplo:
+#   python indice_aqi.py historico_poluicao.csv --norma CONAMA --saida historico_iqar.csv
+
+VOLUME_MOLAR = 24.45  # L/mol a 25 °C e 1 atm (µg/m³ -> ppb)
+MASSA_MOLAR = {'no2': 46.0055, 'o3': 47.9982, 'so2': 64.066, 'co': 28.010}
+
+
+def _ppb(poluente):
+    return VOLUME_MOLAR / MASSA_MOLAR[poluente]
+
+
+NORMAS = {
+    'EPA': {
+        'indice': [(0, 50), (51, 100), (101, 150), (151, 200), (201, 300), (301, 500)],
+        'categorias': ['Boa', 'Moderada', 'Insalubre p/ sensíveis', 'Insalubre', 'Muito insalubre', 'Perigosa'],
+        'poluentes': {
+            # fator: µg/m³ -> unidade da tabela; casas: truncamento oficial da concentração
+            'pm2_5': {'periodo': '24h', 'fator': 1.0, 'casas': 1,
+                      'cortes': [(0.0, 9.0), (9.1, 35.4), (35.5, 55.4), (55.5, 125.4), (125.5, 225.4), (225.5, 325.4)]},
+            'pm10': {'periodo': '24h', 'fator': 1.0, 'casas': 0,
+                     'cortes': [(0, 54), (55, 154), (155, 254), (255, 354), (355, 424), (425, 604)]},
+            'o3': {'periodo': '8h', 'fator': _ppb('o3'), 'casas': 0, 'indefinido_acima': True,
+                   'cortes': [(0, 54), (55, 70), (71, 85), (86, 105), (106, 200), None]},
+            'o3_1h': {'coluna': 'o3', 'periodo': '1h', 'fator': _ppb('o3'), 'casas': 0,
+                      'cortes': [None, None, (125, 164), (165, 204), (205, 404), (405, 604)]},
+            'no2': {'periodo': '1h', 'fator': _ppb('no2'), 'casas': 0,
+                    'cortes': [(0, 53), (54, 100), (101, 360), (361, 649), (650, 1249), (1250, 2049)]},
+            'so2': {'periodo': '1h', 'fator': _ppb('so2'), 'casas': 0,
+                    'cortes': [(0, 35), (36, 75), (76, 185), (186, 304), None, None]},
+            'so2_24h': {'coluna': 'so2', 'periodo': '24h', 'fator': _ppb('so2'), 'casas': 0,
+                        'cortes': [None, None, None, None, (305, 604), (605, 1004)]},
+            'co': {'periodo': '8h', 'fator': _ppb('co') / 1000, 'casas': 1,  # ppm
+                   'cortes': [(0.0, 4.4), (4.5, 9.4), (9.5, 12.4), (12.5, 15.4), (15.5, 30.4), (30.5, 50.4)]},
+        },
+    },
+    'CONAMA': {
+        'indice': [(0, 40), (41, 80), (81, 120), (121, 200), (201, 400)],
+        'categorias': ['Boa', 'Moderada', 'Ruim', 'Muito Ruim', 'Péssima'],
+        'poluentes': {
+            'pm2_5': {'periodo': '24h', 'fator': 1.0, 'casas': 0,
+                      'cortes': [(0, 25), (25, 50), (50, 75), (75, 125), (125, 300)]},
+            'pm10': {'periodo': '24h', 'fator': 1.0, 'casas': 0,
+                     'cortes': [(0, 50), (50, 100), (100, 150), (150, 250), (250, 600)]},
+            'o3': {'periodo': '8h', 'fator': 1.0, 'casas': 0,
+                   'cortes': [(0, 100), (100, 130), (130, 160), (160, 200), (200, 800)]},
+            'no2': {'periodo': '1h', 'fator': 1.0, 'casas': 0,
+                    'cortes': [(0, 200), (200, 240), (240, 320), (320, 1130), (1130, 3750)]},
+            'so2': {'periodo': '24h', 'fator': 1.0, 'casas': 0,
+                    'cortes': [(0, 20), (20, 40), (40, 365), (365, 800), (800, 2620)]},
+            'co': {'periodo': '8h', 'fator': _ppb('co') / 1000, 'casas': 1,  # ppm
+                   'cortes': [(0, 9), (9, 11), (11, 13), (13, 15), (15, 50)]},
+        },
+    },
+}
+
+TAMANHO_BLOCO = 500_000
+
+
+def _norma(nome):
+    if nome not in NORMAS:
+        raise ValueError(f"Norma desconhecida: {nome} (use {', '.join(NORMAS)})")
+    return NORMAS[nome]
+
+
+def _tabelas(cfg, colunas):
+    """(chave, coluna de origem) de cada tabela da norma cuja coluna está em `colunas`."""
+    tabelas = [(chave, tabela.get('coluna', chave)) for chave, tabela in cfg['poluentes'].items()]
+    return [(chave, coluna) for chave, coluna in tabelas if coluna in colunas]
+
+
+# --- 1. SUBÍNDICES ---
+def subindice(concentracao, poluente, norma='EPA'):
+    """
+    Subíndice de uma tabela (`poluente` é a chave, ex: 'o3' ou 'o3_1h') para um array de
+    concentrações em µg/m³ (NaN continua NaN). Acima do último corte definido o índice fica
+    no teto dessa faixa (NaN com 'indefinido_acima'); abaixo do primeiro corte definido
+    (tabelas parciais) fica NaN.
+    """
+    cfg = _norma(norma)
+    tabela = cfg['poluentes'][poluente]
+    definidas = [k for k, corte in enumerate(tabela['cortes']) if corte is not None]
+    cortes = np.asarray([tabela['cortes'][k] for k in definidas], dtype='float64')
+    faixas = np.asarray(cfg['indice'], dtype='float64')[definidas]
+
+    escala = 10.0 ** tabela['casas']
+    c = np.floor(np.asarray(concentracao, dtype='float64') * tabela['fator'] * escala) / escala
+    c = np.maximum(c, 0.0)
+
+    # Faixa = primeiro corte superior >= c
+    k = np.minimum(np.searchsorted(cortes[:, 1], c, side='left'), len(cortes) - 1)
+    c_lo, c_hi = cortes[k, 0], cortes[k, 1]
+    i_lo, i_hi = faixas[k, 0], faixas[k, 1]
+    with np.errstate(invalid='ignore'):
+        indice = i_lo + (i_hi - i_lo) / (c_hi - c_lo) * (c - c_lo)
+    # Concentrações nos vãos entre faixas (ex: 54 < O3 < 55 ppb) ficam no início da faixa
+    indice = np.clip(indice, i_lo, i_hi)
+    fora = c < cortes[0, 0]
+    if tabela.get('indefinido_acima'):
+        fora |= c > cortes[-1, 1]
+    return np.where(fora, np.nan, indice).astype('float32')
+
+
+def medias_moveis(df, norma='EPA', col_tempo='data_hora', por=None):
+    """
+    Média móvel de cada poluente no período da norma (24 h, 8 h ou 1 h), exigindo
+    75% das horas da janela. Com `por`, cada estação tem sua janela.
+    Uma coluna por tabela da norma (na EPA, 'o3_1h' e 'so2_24h' além de 'o3' e 'so2').
+    """
+    cfg = _norma(norma)
+    tabelas = _tabelas(cfg, df.columns)
+    if por is not None:
+        partes = [medias_moveis(grupo, norma, col_tempo) for _, grupo in df.groupby(por, observed=True, sort=False)]
+        if not partes:
+            return pd.DataFrame(index=df.index, columns=[chave for chave, _ in tabelas], dtype='float32')
+        return pd.concat(partes).reindex(df.index)
+
+    serie = df.set_index(pd.to_datetime(df[col_tempo]))
+    medias = {}
+    for chave, coluna in tabelas:
+        periodo = cfg['poluentes'][chave]['periodo']
+        horas = pd.Timedelta(periodo) / pd.Timedelta('1h')
+        if horas <= 1:
+            medias[chave] = df[coluna].to_numpy(dtype='float32')
+            continue
+        janela = serie[coluna].astype('float64').rolling(periodo, min_periods=math.ceil(0.75 * horas))
+        medias[chave] = janela.mean().to_numpy(dtype='float32')
+    return pd.DataFrame(medias, index=df.index)
+
+
+# --- 2. ÍNDICE FINAL + POLUENTE DOMINANTE ---
+def _classificar(indice, cfg):
+    """(nível 1..N, categoria) de cada índice; NaN fica sem nível/categoria."""
+    indice = np.asarray(indice, dtype='float64')
+    sem_dado = np.isnan(indice)
+    tetos = np.asarray([hi for _, hi in cfg['indice']], dtype='float64')
+    faixa = np.minimum(np.searchsorted(tetos, indice, side='left'), len(tetos) - 1)
+    nivel = pd.array(np.where(sem_dado, None, faixa + 1), dtype='Int8')
+    categoria = pd.Categorical(np.where(sem_dado, None, np.asarray(cfg['categorias'], dtype=object)[faixa]),
+                               categories=cfg['categorias'], ordered=True)
+    return nivel, categoria
+
+
+def calcular_aqi(df, norma='EPA', col_tempo='data_hora', por=None, medias=True):
+    """
+    Devolve, alinhado ao `df`: iqa_<poluente> por poluente presente, 'indice' (maior subíndice),
+    'poluente_dominante', 'nivel' (1 = melhor) e 'categoria'.
+    Com `medias=False`, as concentrações já estão no período da norma (uma coluna por chave
+    de tabela; sem 'o3_1h'/'so2_24h' a EPA usa só o O3 de 8 h e o SO2 de 1 h, no teto das faixas).
+    """
+    cfg = _norma(norma)
+    concentracoes = medias_moveis(df, norma, col_tempo, por) if medias else df
+    chaves = [chave for chave in cfg['poluentes'] if chave in concentracoes.columns]
+    poluentes = list(dict.fromkeys(cfg['poluentes'][chave].get('coluna', chave) for chave in chaves))
+    if not poluentes:
+        raise ValueError("Nenhum poluente reconhecido (pm2_5, pm10, no2, o3, so2, co).")
+
+    def _subindice_poluente(poluente):
+        return np.fmax.reduce([subindice(concentracoes[chave].to_numpy(), chave, norma) for chave in chaves
+                               if cfg['poluentes'][chave].get('coluna', chave) == poluente])
+
+    matriz = np.column_stack([_subindice_poluente(p) for p in poluentes])
+    sem_dado = np.isnan(matriz).all(axis=1)
+    dominante = np.argmax(np.where(np.isnan(matriz), -np.inf, matriz), axis=1)
+    indice = matriz[np.arange(len(matriz)), dominante]
+
+    resultado = pd.DataFrame({f'iqa_{p}': matriz[:, i] for i, p in enumerate(poluentes)}, index=df.index)
+    resultado['indice'] = np.where(sem_dado, np.nan, indice).astype('float32')
+    resultado['poluente_dominante'] = pd.Categorical(
+        np.where(sem_dado, None, np.asarray(poluentes, dtype=object)[dominante]), categories=poluentes)
+    resultado['nivel'], resultado['categoria'] = _classificar(resultado['indice'], cfg)
+    return resultado
+
+
+def resumo_diario(df, norma='EPA', col_tempo='data_hora'):
+    """
+    Rollup diário do histórico horário: média diária de cada coluna numérica + índice do dia
+    (maior índice horário), poluente dominante e categoria nessa hora.
+    """
+    horario = df.join(calcular_aqi(df, norma, col_tempo).drop(columns=['nivel', 'categoria']))
+    horario[col_tempo] = pd.to_datetime(horario[col_tempo])
+    numericas = horario.drop(columns=['indice']).select_dtypes('number').columns
+    serie = horario.set_index(col_tempo)
+    diario = serie[numericas].resample('D').mean()
+
+    dias = serie.index.floor('D')
+    pico = serie.assign(_dia=dias).dropna(subset=['indice']).sort_values('indice').groupby('_dia').tail(1)
+    pico = pico.set_index('_dia')[['indice', 'poluente_dominante']]
+    diario = diario.join(pico)
+    diario['nivel'], diario['categoria'] = _classificar(diario['indice'], _norma(norma))
+    return diario
+
+
+# --- 3. ARQUIVOS GRANDES (EM BLOCOS) ---
+def calcular_em_blocos(caminho, norma='EPA', tamanho_bloco=TAMANHO_BLOCO, col_tempo='data_hora'):
+    """
+    Gera blocos (linhas originais + índices) de um CSV horário ordenado por tempo.
+    As últimas 24 h de cada bloco acompanham o próximo para as médias móveis não quebrarem na emenda.
+    """
+    sobra = None
+    for bloco in pd.read_csv(caminho, parse_dates=[col_tempo], chunksize=tamanho_bloco):
+        n_sobra = 0 if sobra is None else len(sobra)
+        janela = bloco if sobra is None else pd.concat([sobra, bloco], ignore_index=True)
+        resultado = calcular_aqi(janela, norma, col_tempo).iloc[n_sobra:]
+        yield bloco.join(resultado.set_index(bloco.index))
+        sobra = janela[janela[col_tempo] > janela[col_tempo].iloc[-1] - pd.Timedelta('24h')]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Índice de qualidade do ar multipoluente (EPA ou CONAMA)")
+    parser.add_argument('arquivo', nargs='?', default="historico_poluicao.csv")
+    parser.add_argument('--norma', default='EPA', choices=list(NORMAS))
+    parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO, help="linhas por bloco de leitura")
+    parser.add_argument('--saida', help="CSV com as linhas originais + índices")
+    args = parser.parse_args()
+
+    contagem = pd.Series(dtype='int64')
+    dominantes = pd.Series(dtype='int64')
+    primeiro = True
+    for bloco in calcular_em_blocos(args.arquivo, args.norma, args.bloco):
+        contagem = contagem.add(bloco['categoria'].value_counts(sort=False), fill_value=0)
+        dominantes = dominantes.add(bloco['poluente_dominante'].value_counts(sort=False), fill_value=0)
+        if args.saida:
+            bloco.to_csv(args.saida, mode='w' if primeiro else 'a', header=primeiro, index=False)
+        primeiro = False
+
+    print(f"🌫️ Distribuição por categoria ({args.norma}):")
+    for categoria in NORMAS[args.norma]['categorias']:
+        print(f"   {categoria}: {int(contagem.get(categoria, 0))} h")
+    print("🏭 Poluente dominante:")
+    for poluente, horas in dominantes.sort_values(ascending=False).items():
+        print(f"   {poluente}: {int(horas)} h")
+    if args.saida:
+        print(f"💾 Índices salvos em '{args.saida}'")
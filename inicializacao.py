@@ -0,0 +1,114 @@
+import importlib
+import os
+import threading
+import time
+
+# --- INICIALIZAÇÃO PREGUIÇOSA (COLD START RÁPIDO) ---
+# O Earth Engine e o Prophet/Stan levam vários segundos para carregar.
+# Aqui eles são preparados em segundo plano, enquanto a interface já aparece.
+#
+# A thread só repete ee.Initialize(): ee.Authenticate() abre navegador/servidor
+# local e espera o usuário, o que num servidor trava as tentativas para sempre.
+# Só roda com CARBONCAST_EE_INTERATIVO=1 (uso local, no terminal). Quem espera
+# pelo EE espera no máximo TIMEOUT_EE segundos e recebe EEIndisponivel.
+
+INTERATIVO = os.environ.get('CARBONCAST_EE_INTERATIVO') == '1'
+TIMEOUT_EE = float(os.environ.get('CARBONCAST_EE_TIMEOUT', '30'))
+
+
+class EEIndisponivel(RuntimeError):
+    """O Earth Engine não inicializou (tentativas esgotadas)."""
+
+
+class EEInicializando(EEIndisponivel, TimeoutError):
+    """O Earth Engine ainda está inicializando e o tempo de espera acabou."""
+
+
+_lock = threading.Lock()
+_ee_pronto = threading.Event()
+_estado = {'thread': None, 'erro': None, 'tentativas': 0}
+
+
+def _inicializar_ee(tentativas, espera_inicial, interativo):
+    """Tenta ee.Initialize() com backoff exponencial. Roda em thread própria."""
+    import ee
+
+    espera = espera_inicial
+    autenticou = not interativo
+    for tentativa in range(1, tentativas + 1):
+        _estado['tentativas'] = tentativa
+        try:
+            ee.Initialize()
+            _estado['erro'] = None
+            _ee_pronto.set()
+            return
+        except Exception as e:
+            _estado['erro'] = e
+            # Só no modo interativo: na primeira falha, pede autenticação
+            if not autenticou:
+                autenticou = True
+                try:
+                    ee.Authenticate()
+                    continue
+                except Exception as e_auth:
+                    _estado['erro'] = e_auth
+            if tentativa < tentativas:
+                time.sleep(espera)
+                espera = min(espera * 2, 30)
+
+
+def iniciar_ee_em_background(tentativas=5, espera_inicial=1.0, interativo=None):
+    """Dispara a inicialização do EE uma única vez por processo (não bloqueia)."""
+    interativo = INTERATIVO if interativo is None else interativo
+    with _lock:
+        thread = _estado['thread']
+        if _ee_pronto.is_set() or (thread is not None and thread.is_alive()):
+            return _ee_pronto
+        thread = threading.Thread(
+            target=_inicializar_ee, args=(tentativas, espera_inicial, interativo),
+            name="ee-init", daemon=True,
+        )
+        _estado['thread'] = thread
+        thread.start()
+    return _ee_pronto
+
+
+def ee_pronto():
+    return _ee_pronto.is_set()
+
+
+def obter_ee(timeout=TIMEOUT_EE, interativo=None):
+    """
+    Devolve o módulo `ee` já inicializado.
+    Se a inicialização ainda não começou, dispara agora e espera por ela, no máximo
+    `timeout` segundos. Scripts de terminal usam timeout=None e interativo=True
+    (autenticação pelo navegador na primeira vez); app e API nunca.
+    """
+    iniciar_ee_em_background(interativo=interativo)
+    limite = None if timeout is None else time.monotonic() + timeout
+    intervalo = 0.5 if timeout is None else min(0.5, max(timeout, 0.01))
+    while not _ee_pronto.wait(intervalo):
+        thread = _estado['thread']
+        if thread is not None and not thread.is_alive() and not _ee_pronto.is_set():
+            # Esgotou as tentativas: libera uma nova rodada para a próxima chamada
+            with _lock:
+                _estado['thread'] = None
+            raise EEIndisponivel(f"Earth Engine indisponível: {_estado['erro']}")
+        if limite is not None and time.monotonic() > limite:
+            raise EEInicializando("Earth Engine ainda inicializando.")
+    import ee
+    return ee
+
+
+def precarregar_modulos(*nomes):
+    """Importa módulos pesados (ex: 'prophet') numa thread em segundo plano."""
+    def _carregar():
+        for nome in nomes:
+            try:
+                importlib.import_module(nome)
+            except Exception:
+                pass  # O erro real aparece no primeiro uso
+
+    thread = threading.Thread(target=_carregar, name="precarga", daemon=True)
+    thread.start()
+    return thread
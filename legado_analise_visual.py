@@ -2,6 +2,8 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
+import indice_aqi
+
 # Configuração de estilo para parecer profissional
 plt.style.use('bmh') # Estilo visual limpo (Business/Science)
 
@@ -19,10 +21,11 @@ def plot_analise():
     # --- TÉCNICA DE RESAMPLING ---
     # Dados horários são muito "tremidos". Vamos tirar a média DIÁRIA.
     # Isso suaviza o gráfico e mostra a tendência real.
-    df_diario = df.set_index('data_hora').resample('D').mean()
+    # O rollup também traz o IQAr do dia (CONAMA 491/2018, todos os poluentes) e o poluente dominante.
+    df_diario = indice_aqi.resumo_diario(df, 'CONAMA')
 
-    # Criar uma figura com 2 gráficos (subplots)
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 10), sharex=True)
+    # Criar uma figura com 3 gráficos (subplots)
+    fig, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(12, 14), sharex=True)
 
     # GRÁFICO 1: Poluição por Partículas (PM2.5) - Saúde
     ax1.plot(df_diario.index, df_diario['pm2_5'], color='#d62728', linewidth=2)
@@ -38,12 +41,25 @@ def plot_analise():
     ax2.plot(df_diario.index, df_diario['no2'], color='#1f77b4', linewidth=2)
     ax2.set_title('Concentração Média Diária de NO2 (Indicador de Tráfego)', fontsize=14)
     ax2.set_ylabel('µg/m³')
-    ax2.set_xlabel('Data')
     ax2.grid(True, linestyle='--', alpha=0.7)
 
+    # GRÁFICO 3: Índice de Qualidade do Ar (pior hora do dia) com as faixas da norma
+    cores_faixas = ['#28a745', '#ffc107', '#fd7e14', '#dc3545', '#6f42c1']
+    for (inicio, fim), cor, nome in zip(indice_aqi.NORMAS['CONAMA']['indice'], cores_faixas,
+                                        indice_aqi.NORMAS['CONAMA']['categorias']):
+        ax3.axhspan(inicio, fim, color=cor, alpha=0.15, label=nome)
+    ax3.plot(df_diario.index, df_diario['indice'], color='black', linewidth=1.5)
+    ax3.set_ylim(0, max(df_diario['indice'].max() * 1.2, 80))
+    dominante = df_diario['poluente_dominante'].value_counts().idxmax()
+    ax3.set_title(f'IQAr Diário (CONAMA 491/2018) - Poluente Dominante: {dominante}', fontsize=14)
+    ax3.set_ylabel('IQAr')
+    ax3.set_xlabel('Data')
+    ax3.grid(True, linestyle='--', alpha=0.7)
+    ax3.legend(loc='upper right', fontsize=8)
+
     # Formatar eixo X para mostrar os meses corretamente
-    ax2.xaxis.set_major_formatter(mdates.DateFormatter('%b/%Y'))
-    ax2.xaxis.set_major_locator(mdates.MonthLocator())
+    ax3.xaxis.set_major_formatter(mdates.DateFormatter('%b/%Y'))
+    ax3.xaxis.set_major_locator(mdates.MonthLocator())
     plt.xticks(rotation=45)
 
     plt.tight_layout()
@@ -2,6 +2,8 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
+import indice_aqi
+
 # Configurações
 DIAS_HISTORICO = 365
 DATA_INICIO = datetime(2023, 1, 1)
@@ -27,22 +29,9 @@ no2 = np.maximum(no2, 0) # Não permitir valores negativos
 # Tende a acumular se não ventar, varia com estação
 pm2_5 = 15 + np.random.normal(0, 5, n_registros) + (no2 * 0.3)
 
-# Simulação de AQI (Índice de Qualidade do Ar)
-# Baseado no PM2.5 (Simplificação)
-conditions = [
-    (pm2_5 <= 12),
-    (pm2_5 > 12) & (pm2_5 <= 35),
-    (pm2_5 > 35) & (pm2_5 <= 55),
-    (pm2_5 > 55) & (pm2_5 <= 150),
-    (pm2_5 > 150)
-]
-choices = [1, 2, 3, 4, 5] # 1=Bom, 5=Péssimo
-aqi = np.select(conditions, choices, default=5)
-
 # Montar o DataFrame igual ao que viria da API
 df_mock = pd.DataFrame({
     'data_hora': datas,
-    'aqi': aqi,
     'co': np.random.uniform(200, 500, n_registros),
     'no': np.random.uniform(0, 10, n_registros),
     'no2': no2,
@@ -53,6 +42,10 @@ df_mock = pd.DataFrame({
     'nh3': np.random.uniform(0, 5, n_registros)
 })
 
+# AQI (Índice de Qualidade do Ar) calculado de todos os poluentes pelo motor do indice_aqi:
+# níveis N1-N5 da CONAMA 491/2018, na mesma escala 1 (Boa) a 5 (Péssima) da API
+df_mock.insert(1, 'aqi', indice_aqi.calcular_aqi(df_mock, 'CONAMA')['nivel'].fillna(1).astype(int))
+
 # Salvar
 arquivo_saida = "historico_poluicao.csv"
 df_mock.to_csv(arquivo_saida, index=False)
@@ -1,18 +1,15 @@
-import ee
 import datetime
 
+from inicializacao import obter_ee
+
 # 1. Autenticação e Inicialização
 # Na primeira vez que rodar, isso vai abrir uma janela no navegador pedindo permissão.
 # Depois de dar permissão, ele gera um token.
-try:
-    ee.Initialize()
-except Exception as e:
-    print("A inicializar autenticação...")
-    ee.Authenticate()
-    ee.Initialize()
+# A inicialização só acontece no primeiro uso (importar este módulo é instantâneo).
 
 def obter_poluicao(lat, lon):
     print(f"🔄 Consultando satélite para Lat: {lat}, Lon: {lon}...")
+    ee = obter_ee(timeout=None, interativo=True)
 
     # 2. Definir o local (Ponto geográfico)
     ponto = ee.Geometry.Point([lon, lat]) # Atenção: GEE usa [Longitude, Latitude]
@@ -53,11 +50,12 @@ def obter_poluicao(lat, lon):
         return "Dado indisponível (coberto por nuvens ou fora da varredura)."
 
 # --- TESTE ---
-# Exemplo: São Paulo, Brasil (Alta poluição esperada)
-lat_sp = -23.5505
-lon_sp = -46.6333
-
-resultado = obter_poluicao(lat_sp, lon_sp)
-print("\n" + "="*30)
-print(resultado)
-print("="*30)
\ No newline at end of file
+if __name__ == "__main__":
+    # Exemplo: São Paulo, Brasil (Alta poluição esperada)
+    lat_sp = -23.5505
+    lon_sp = -46.6333
+
+    resultado = obter_poluicao(lat_sp, lon_sp)
+    print("\n" + "="*30)
+    print(resultado)
+    print("="*30)
\ No newline at end of file
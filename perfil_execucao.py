@@ -0,0 +1,180 @@
+import cProfile
+import datetime
+import glob
+import json
+import os
+import pstats
+import threading
+import time
+
+import pandas as pd
+
+# --- PERFIL POR EXECUÇÃO DO SCRIPT (OPT-IN) ---
+# Quando uma página fica lenta, mostra se o tempo foi para os reruns do
+# Streamlit, serialização do Folium, Prophet/Stan ou Earth Engine.
+# Ativação: CARBONCAST_PROFILE=1 ou o toggle de admin na sidebar do app.
+# Cada execução vira um .prof (abre no snakeviz/pstats) + .json com as tags;
+# só os últimos CARBONCAST_PERFIS_MAX ficam no disco.
+
+PASTA_PERFIS = os.environ.get('CARBONCAST_PERFIS', 'perfis')
+MAX_PERFIS = int(os.environ.get('CARBONCAST_PERFIS_MAX', '20'))
+
+# Trechos do caminho do arquivo -> componente (primeiro que casar). Funções sem
+# componente (builtins '~', sockets, sleep, subprocess.wait...) herdam o do chamador
+# mais próximo que tenha um, então a espera bloqueante cai em quem a causou.
+# Só a thread do script é perfilada: a série completa da extração progressiva roda
+# noutra thread e aparece como a espera em extracao_progressiva (Earth Engine).
+COMPONENTES = [
+    ('Prophet/Stan', ('prophet', 'cmdstanpy', 'stan')),
+    ('Earth Engine', ('/ee/', '\\ee\\', 'googleapiclient', 'httplib2', 'google/auth', 'extracao_progressiva')),
+    ('Folium', ('folium', 'branca', 'jinja2')),
+    ('Plotly', ('plotly',)),
+    ('Streamlit', ('streamlit',)),
+    ('Pandas/NumPy', ('pandas', 'numpy')),
+]
+
+# Só um cProfile pode estar ativo por processo: sessões simultâneas ficam sem perfil.
+# Quem chama deve finalizar num try/finally (o app faz isso); TEMPO_ORFAO é só uma
+# salvaguarda para um chamador que não finalize. O cProfile só pode ser desligado
+# na thread que o ligou: um órfão de outra thread viva nunca é tomado.
+TEMPO_ORFAO = 300
+_lock = threading.Lock()
+_atual = {'perfil': None, 'desde': 0.0}
+
+
+def ativado_por_ambiente():
+    return os.environ.get('CARBONCAST_PROFILE') == '1'
+
+
+class PerfilExecucao:
+    """Perfil de uma execução do script; `iniciar()` devolve False se outro perfil estiver ativo."""
+
+    def __init__(self):
+        self.perfil = cProfile.Profile()
+        self.inicio = None
+        self.ativo = False
+        self.thread = None
+
+    def iniciar(self):
+        if not _lock.acquire(blocking=False):
+            orfao = _atual['perfil']
+            if orfao is None or time.perf_counter() - _atual['desde'] < TEMPO_ORFAO:
+                return False
+            if orfao.thread == threading.get_ident():
+                orfao.perfil.disable()
+            elif any(t.ident == orfao.thread for t in threading.enumerate()):
+                return False  # a thread dona ainda existe: só ela pode desligar o cProfile
+            orfao.ativo = False
+        try:
+            self.perfil.enable()
+        except ValueError:  # outro profiler (ex: depurador) já está ativo
+            _atual['perfil'] = None
+            _lock.release()
+            return False
+        self.inicio = time.perf_counter()
+        self.ativo = True
+        self.thread = threading.get_ident()
+        _atual.update(perfil=self, desde=self.inicio)
+        return True
+
+    def finalizar(self, **tags):
+        """Para o perfil, grava .prof + .json e aplica a rotação. Devolve o caminho do .prof."""
+        if not self.ativo:
+            return None
+        self.perfil.disable()
+        self.ativo = False
+        _atual['perfil'] = None
+        _lock.release()
+
+        duracao = time.perf_counter() - self.inicio
+        agora = datetime.datetime.now()
+        sufixo = '_'.join(f"{v}" for v in tags.values() if v is not None)
+        sufixo = ''.join(c if c.isalnum() or c in '-.' else '_' for c in sufixo)[:60]
+        base = os.path.join(PASTA_PERFIS, f"{agora:%Y%m%d_%H%M%S_%f}_{sufixo}".rstrip('_'))
+
+        os.makedirs(PASTA_PERFIS, exist_ok=True)
+        self.perfil.dump_stats(base + '.prof')
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'quando': agora.isoformat(timespec='seconds'), 'duracao_s': round(duracao, 3), **tags},
+                      f, ensure_ascii=False, default=str)
+        _rotacionar()
+        return base + '.prof'
+
+
+def _rotacionar():
+    perfis = sorted(glob.glob(os.path.join(PASTA_PERFIS, '*.prof')))
+    for antigo in perfis[:-MAX_PERFIS] if MAX_PERFIS > 0 else perfis:
+        for extensao in ('.prof', '.json'):
+            try:
+                os.remove(antigo[:-len('.prof')] + extensao)
+            except FileNotFoundError:
+                pass
+
+
+def listar_perfis():
+    """Metadados dos perfis guardados, do mais recente para o mais antigo."""
+    linhas = []
+    for caminho in sorted(glob.glob(os.path.join(PASTA_PERFIS, '*.json')), reverse=True):
+        with open(caminho, encoding='utf-8') as f:
+            meta = json.load(f)
+        meta['arquivo'] = caminho[:-len('.json')] + '.prof'
+        linhas.append(meta)
+    return pd.DataFrame(linhas)
+
+
+def _estatisticas(caminho):
+    return pstats.Stats(caminho).stats
+
+
+def top_funcoes(caminho, n=15):
+    """As `n` funções com maior tempo acumulado."""
+    linhas = []
+    for (arquivo, linha, nome), (_, ncalls, tottime, cumtime, _) in _estatisticas(caminho).items():
+        linhas.append({'funcao': f"{nome} ({os.path.basename(arquivo)}:{linha})", 'chamadas': ncalls,
+                       'tempo_proprio_s': round(tottime, 4), 'tempo_acumulado_s': round(cumtime, 4)})
+    df = pd.DataFrame(linhas, columns=['funcao', 'chamadas', 'tempo_proprio_s', 'tempo_acumulado_s'])
+    return df.sort_values('tempo_acumulado_s', ascending=False).head(n).reset_index(drop=True)
+
+
+def _componente_do_arquivo(arquivo):
+    for nome, trechos in COMPONENTES:
+        if any(t in arquivo for t in trechos):
+            return nome
+    return None
+
+
+def _componente(funcao, estatisticas, memo):
+    """Componente da função ou, se não tiver, do chamador mais pesado (subindo até achar um)."""
+    if funcao in memo:
+        return memo[funcao]
+    memo[funcao] = 'Outros'  # guarda contra recursão nos ciclos do grafo de chamadas
+    componente = _componente_do_arquivo(funcao[0])
+    if componente is None:
+        chamadores = estatisticas.get(funcao, (0, 0, 0, 0, {}))[4]
+        if chamadores:
+            chamador = max(chamadores, key=lambda c: chamadores[c][3])
+            componente = _componente(chamador, estatisticas, memo)
+    memo[funcao] = componente or 'Outros'
+    return memo[funcao]
+
+
+def tempo_por_componente(caminho):
+    """
+    Tempo próprio por componente (Prophet, Earth Engine, Folium, ...). O tempo de funções
+    sem componente é repartido pelos chamadores (tempo daquela aresta) e vai para o
+    componente de cada um.
+    """
+    estatisticas = _estatisticas(caminho)
+    memo = {}
+    totais = {}
+    for funcao, (_, _, tottime, _, chamadores) in estatisticas.items():
+        componente = _componente_do_arquivo(funcao[0])
+        if componente is not None or not chamadores:
+            partes = [(componente or 'Outros', tottime)]
+        else:
+            partes = [(_componente(chamador, estatisticas, memo), aresta[2]) for chamador, aresta in chamadores.items()]
+        for nome, tempo in partes:
+            totais[nome] = totais.get(nome, 0.0) + tempo
+    df = pd.DataFrame(sorted(totais.items(), key=lambda x: -x[1]), columns=['componente', 'tempo_s'])
+    df['tempo_s'] = df['tempo_s'].round(3)
+    return df
@@ -1,18 +1,14 @@
-import ee
 import pandas as pd
-import matplotlib.pyplot as plt
-from prophet import Prophet
 
-# 1. Autenticação
-try:
-    ee.Initialize()
-except:
-    ee.Authenticate()
-    ee.Initialize()
+from dados_satelite import opcoes_prophet
+from inicializacao import obter_ee
+
+# 1. Autenticação (adiada para o primeiro uso do Earth Engine)
 
 # 2. Função de Extração (CORRIGIDA)
 def extrair_dados_historicos(lat, lon):
     print(f"📡 Baixando dados históricos para Lat: {lat}, Lon: {lon}...")
+    ee = obter_ee(timeout=None, interativo=True)
     ponto = ee.Geometry.Point([lon, lat])
     
     # Pegando dados desde 2020 
@@ -48,11 +44,13 @@ def extrair_dados_historicos(lat, lon):
     return df
 
 # 3. Função de Previsão
-def gerar_previsao(df_historico, anos_futuros=2):
+def gerar_previsao(df_historico, anos_futuros=2, gas_type='NO2', lat=None, lon=None):
     print("🔮 Treinando o modelo de IA (Prophet)...")
+    from prophet import Prophet
     
-    # Ajuste de sensibilidade: daily_seasonality=False evita overfitting em ruídos
-    modelo = Prophet(daily_seasonality=False, weekly_seasonality=True, yearly_seasonality=True)
+    # Mesma configuração do app (daily_seasonality=False evita overfitting em ruídos),
+    # com os parâmetros ajustados para o gás/região se houver
+    modelo = Prophet(**opcoes_prophet(gas_type, lat, lon, yearly_seasonality=True))
     
     modelo.fit(df_historico)
     
@@ -62,41 +60,43 @@ def gerar_previsao(df_historico, anos_futuros=2):
     return modelo, previsao
 
 # --- EXECUÇÃO ---
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-lat, lon = -23.5505, -46.6333
+    lat, lon = -23.5505, -46.6333
 
-df = extrair_dados_historicos(lat, lon)
+    df = extrair_dados_historicos(lat, lon)
 
-if not df.empty:
-    print(f"✅ Histórico recuperado: {len(df)} pontos de dados.")
+    if not df.empty:
+        print(f"✅ Histórico recuperado: {len(df)} pontos de dados.")
     
-    # Prevendo 3 anos à frente
-    modelo, forecast = gerar_previsao(df, anos_futuros=3) 
+        # Prevendo 3 anos à frente
+        modelo, forecast = gerar_previsao(df, anos_futuros=3, lat=lat, lon=lon) 
     
-    print("✅ Previsão concluída! Gerando gráfico...")
+        print("✅ Previsão concluída! Gerando gráfico...")
 
-    plt.figure(figsize=(14, 7))
+        plt.figure(figsize=(14, 7))
     
-    # Dados Reais
-    plt.scatter(df['ds'], df['y'], color='black', s=5, label='Dados Reais')
+        # Dados Reais
+        plt.scatter(df['ds'], df['y'], color='black', s=5, label='Dados Reais')
     
-    # Previsão
-    plt.plot(forecast['ds'], forecast['yhat'], color='#0077b6', linewidth=2, label='Tendência (IA)')
+        # Previsão
+        plt.plot(forecast['ds'], forecast['yhat'], color='#0077b6', linewidth=2, label='Tendência (IA)')
     
-    # Intervalo de Confiança (Sombra)
-    plt.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], color='#0077b6', alpha=0.2)
+        # Intervalo de Confiança (Sombra)
+        plt.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], color='#0077b6', alpha=0.2)
 
-    plt.title(f'Previsão de Poluentes (NO2) - IA Prophet\nLat: {lat}, Lon: {lon}', fontsize=16)
-    plt.xlabel('Ano')
-    plt.ylabel('Concentração NO2 (mol/m²)')
-    plt.grid(True, alpha=0.3)
-    plt.legend()
+        plt.title(f'Previsão de Poluentes (NO2) - IA Prophet\nLat: {lat}, Lon: {lon}', fontsize=16)
+        plt.xlabel('Ano')
+        plt.ylabel('Concentração NO2 (mol/m²)')
+        plt.grid(True, alpha=0.3)
+        plt.legend()
     
-    hoje = pd.Timestamp.now()
-    plt.axvline(hoje, color='red', linestyle='--', label='Hoje')
+        hoje = pd.Timestamp.now()
+        plt.axvline(hoje, color='red', linestyle='--', label='Hoje')
     
-    plt.tight_layout()
-    plt.show()
+        plt.tight_layout()
+        plt.show()
 
-else:
-    print("Erro: Sem dados suficientes (verifique se a região não está muito nublada).")
\ No newline at end of file
+    else:
+        print("Erro: Sem dados suficientes (verifique se a região não está muito nublada).")
\ No newline at end of file
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import dados_satelite
+from inicializacao import obter_ee
+
+# --- SÉRIE TEMPORAL POR ÁREA (POLÍGONO GEOJSON) ---
+# Para auditorias de crédito de carbono (fazendas, aterros, municípios).
+# Um único reduceRegion sobre um polígono grande estoura tempo/memória no
+# Earth Engine, então a área é cortada em tiles reduzidos em paralelo e
+# recombinados pela média ponderada pela quantidade de pixels válidos (área).
+# As imagens (período + limite) são escolhidas uma vez para o polígono inteiro,
+# antes do corte, para todos os tiles reduzirem exatamente as mesmas datas.
+
+PASTA_CACHE = os.environ.get('CARBONCAST_CACHE_AREAS', 'cache_areas')
+TTL_CACHE_H = float(os.environ.get('CARBONCAST_CACHE_AREAS_H', '168'))
+TILE_GRAUS = 0.5      # ~55 km de lado: folgado para o limite de pixels por tile
+MAX_WORKERS = 8
+
+_lock_cache = threading.Lock()
+
+
+# --- 1. GEOJSON ---
+def carregar_geojson(conteudo):
+    """Aceita texto, bytes ou dict (Geometry, Feature ou FeatureCollection) e devolve a geometria."""
+    if isinstance(conteudo, bytes):
+        conteudo = conteudo.decode('utf-8')
+    if isinstance(conteudo, str):
+        conteudo = json.loads(conteudo)
+
+    tipo = conteudo.get('type')
+    if tipo == 'FeatureCollection':
+        geometrias = [f['geometry'] for f in conteudo['features']]
+    elif tipo == 'Feature':
+        geometrias = [conteudo['geometry']]
+    else:
+        geometrias = [conteudo]
+
+    poligonos = []
+    for geom in geometrias:
+        if geom['type'] == 'Polygon':
+            poligonos.append(geom['coordinates'])
+        elif geom['type'] == 'MultiPolygon':
+            poligonos.extend(geom['coordinates'])
+        else:
+            raise ValueError(f"Geometria não suportada: {geom['type']} (use Polygon/MultiPolygon)")
+    if not poligonos:
+        raise ValueError("GeoJSON sem polígonos.")
+    return {'type': 'MultiPolygon', 'coordinates': poligonos}
+
+
+def hash_poligono(geometria):
+    """Hash estável da geometria (coordenadas arredondadas em ~10 cm)."""
+    def _arredondar(obj):
+        if isinstance(obj, (list, tuple)):
+            return [_arredondar(x) for x in obj]
+        return round(float(obj), 6)
+
+    canonico = json.dumps(_arredondar(geometria['coordinates']), separators=(',', ':'))
+    return hashlib.sha256(canonico.encode()).hexdigest()[:16]
+
+
+def limites(geometria):
+    """Bounding box (oeste, sul, leste, norte) calculado localmente."""
+    lons, lats = [], []
+    for poligono in geometria['coordinates']:
+        for anel in poligono:
+            for lon, lat in (p[:2] for p in anel):
+                lons.append(lon)
+                lats.append(lat)
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def dividir_em_tiles(geometria, tile_graus=TILE_GRAUS):
+    """Retângulos (oeste, sul, leste, norte) que cobrem o bounding box."""
+    oeste, sul, leste, norte = limites(geometria)
+    n_lon = max(1, math.ceil((leste - oeste) / tile_graus))
+    n_lat = max(1, math.ceil((norte - sul) / tile_graus))
+    passo_lon = (leste - oeste) / n_lon
+    passo_lat = (norte - sul) / n_lat
+    return [
+        (oeste + i * passo_lon, sul + j * passo_lat, oeste + (i + 1) * passo_lon, sul + (j + 1) * passo_lat)
+        for i in range(n_lon) for j in range(n_lat)
+    ]
+
+
+# --- 2. REDUÇÃO POR TILE (SERVIDOR) ---
+def _colecao_area(geometria, col_id, band, limite):
+    """Imagens do polígono inteiro no período, já limitadas: a mesma coleção serve a todos os tiles."""
+    ee = obter_ee()
+    return (ee.ImageCollection(col_id)
+            .filterBounds(ee.Geometry(geometria))
+            .filterDate(dados_satelite.DATA_INICIO, dados_satelite.DATA_FIM)
+            .select(band)
+            .limit(limite, 'system:time_start'))
+
+
+def _reduzir_tile(geometria, tile, collection, band, scale):
+    """Média e contagem de pixels válidos por imagem, dentro de (polígono ∩ tile)."""
+    ee = obter_ee()
+    regiao = ee.Geometry(geometria).intersection(ee.Geometry.Rectangle(list(tile)), ee.ErrorMargin(scale))
+    redutor = ee.Reducer.mean().combine(ee.Reducer.count(), sharedInputs=True)
+
+    def extract(img):
+        date = img.date().format("YYYY-MM-dd")
+        stats = img.reduceRegion(redutor, regiao, scale, maxPixels=1e9, tileScale=4)
+        return img.set({'ds': date, 'media': stats.get(band + '_mean'), 'n': stats.get(band + '_count')})
+
+    mapped = collection.filterBounds(regiao).map(extract).filter(ee.Filter.notNull(['media']))
+    data = mapped.reduceColumns(ee.Reducer.toList(3), ['ds', 'media', 'n']).get('list').getInfo()
+    return pd.DataFrame(data, columns=['ds', 'media', 'n'])
+
+
+def _combinar_tiles(partes, coluna):
+    """Média ponderada por pixels válidos: equivale à média sobre o polígono inteiro."""
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(columns=['ds', coluna])
+    todos = pd.concat(partes, ignore_index=True)
+    todos = todos[todos['n'] > 0].assign(_ponderado=lambda d: d['media'] * d['n'])
+    soma = todos.groupby('ds')[['_ponderado', 'n']].sum()
+    df = (soma['_ponderado'] / soma['n']).rename(coluna).reset_index()
+    df['ds'] = pd.to_datetime(df['ds'])
+    return df.sort_values('ds').reset_index(drop=True)
+
+
+def _serie_por_tiles(geometria, col_id, band, scale, coluna, limite, tile_graus):
+    collection = _colecao_area(geometria, col_id, band, limite)
+    tiles = dividir_em_tiles(geometria, tile_graus)
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(tiles))) as executor:
+        partes = list(executor.map(
+            lambda t: _reduzir_tile(geometria, t, collection, band, scale), tiles))
+    return _combinar_tiles(partes, coluna)
+
+
+# --- 3. CACHE POR HASH DO POLÍGONO ---
+def _caminho_cache(hash_geom, sufixo):
+    return os.path.join(PASTA_CACHE, f"{hash_geom}_{sufixo}.parquet")
+
+
+def _com_cache(hash_geom, sufixo, calcular):
+    """Lê o parquet se tiver menos de TTL_CACHE_H; senão calcula e grava (temporário + os.replace)."""
+    caminho = _caminho_cache(hash_geom, sufixo)
+    try:
+        if time.time() - os.path.getmtime(caminho) <= TTL_CACHE_H * 3600:
+            return pd.read_parquet(caminho)
+    except FileNotFoundError:
+        pass
+    df = calcular()
+    with _lock_cache:
+        os.makedirs(PASTA_CACHE, exist_ok=True)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+    return df
+
+
+# --- 4. API PÚBLICA ---
+def get_area_data(geojson, gas_type, tile_graus=TILE_GRAUS):
+    """Como dados_satelite.get_data, mas reduzindo sobre um polígono."""
+    chave = dados_satelite.chave_gas(gas_type)
+    if chave is None:
+        return pd.DataFrame(), None
+    cfg = dados_satelite.GASES[chave]
+    geometria = carregar_geojson(geojson)
+
+    def _calcular():
+        df = _serie_por_tiles(geometria, cfg['col_id'], cfg['band'], cfg['scale'], 'y', 1000, tile_graus)
+        return dados_satelite.remover_extremos(df)
+
+    return _com_cache(hash_poligono(geometria), chave, _calcular), cfg['band']
+
+
+def get_area_ndvi(geojson, tile_graus=TILE_GRAUS):
+    """Como dados_satelite.get_ndvi, mas reduzindo sobre um polígono."""
+    cfg = dados_satelite.NDVI
+    geometria = carregar_geojson(geojson)
+
+    def _calcular():
+        df = _serie_por_tiles(geometria, cfg['col_id'], cfg['band'], cfg['scale'], 'ndvi', 500, tile_graus)
+        df['ndvi'] = df['ndvi'] / 10000
+        return df
+
+    return _com_cache(hash_poligono(geometria), 'NDVI', _calcular)
@@ -0,0 +1,24 @@
+import ajuste_hiperparametros as ajuste
+import dados_satelite
+
+
+def test_parametros_por_regiao_com_padrao_do_gas(tmp_path, monkeypatch):
+    arquivo = str(tmp_path / 'parametros.json')
+    monkeypatch.setattr(ajuste, 'ARQUIVO_PARAMETROS', arquivo)
+    assert ajuste.parametros_para('NO2', -23.5, -46.6) == {}
+
+    ajuste.salvar_parametros('NO2', '_padrao', {'changepoint_prior_scale': 0.01}, 0.3)
+    ajuste.salvar_parametros('NO2', ajuste.bucket_regiao(-23.5, -46.6), {'changepoint_prior_scale': 0.5}, 0.2)
+    assert ajuste.parametros_para('NO2', -23.5, -46.6) == {'changepoint_prior_scale': 0.5}
+    assert ajuste.parametros_para('NO2', 40.0, 10.0) == {'changepoint_prior_scale': 0.01}
+    assert ajuste.parametros_para('CH4', -23.5, -46.6) == {}
+
+
+def test_app_e_previsao_ia_leem_o_mesmo_armazem(tmp_path, monkeypatch):
+    monkeypatch.setattr(ajuste, 'ARQUIVO_PARAMETROS', str(tmp_path / 'parametros.json'))
+    ajuste.salvar_parametros('CO', '_padrao', {'seasonality_mode': 'multiplicative'}, 0.1)
+
+    app = dados_satelite.opcoes_prophet('CO (Queimadas)', -10.0, -50.0)
+    ia = dados_satelite.opcoes_prophet('CO', -10.0, -50.0, yearly_seasonality=True)
+    assert app['seasonality_mode'] == ia['seasonality_mode'] == 'multiplicative'
+    assert app['daily_seasonality'] is False and ia['yearly_seasonality'] is True
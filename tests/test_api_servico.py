@@ -0,0 +1,148 @@
+import http.client
+import json
+import threading
+
+import pandas as pd
+import pytest
+
+import api_servico
+import artefatos
+import exportacao_lote
+import inicializacao
+
+
+@pytest.fixture
+def servidor():
+    servico = api_servico.ServicoCarbonCast(fonte=api_servico.FonteFake())
+    servidor = api_servico.criar_servidor(servico, '127.0.0.1', 0)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _get(servidor, caminho):
+    conexao = http.client.HTTPConnection('127.0.0.1', servidor.server_address[1], timeout=10)
+    conexao.request('GET', caminho)
+    resposta = conexao.getresponse()
+    return resposta.status, resposta.read()
+
+
+@pytest.mark.parametrize('caminho', ['/exportar?formato=xlsx', '/exportar?gas=XYZ'])
+def test_exportar_valida_antes_do_cabecalho(servidor, caminho):
+    status, corpo = _get(servidor, caminho)
+    assert status == 400
+    assert 'erro' in json.loads(corpo)
+
+
+def test_exportar_erro_no_meio_fecha_a_conexao(servidor, monkeypatch):
+    sites = [{'site': s, 'gas': 'NO2', 'lat': -23.5, 'lon': -46.6} for s in ('A', 'B')]
+    monkeypatch.setattr(exportacao_lote, 'sites_dos_artefatos', lambda gases=None: iter(sites))
+
+    def previsao(site, ao_vivo=False):
+        if site['site'] == 'B':
+            raise ValueError("artefato corrompido")
+        ds = pd.date_range('2024-01-01', periods=3, freq='D')
+        return pd.DataFrame({'ds': ds, 'yhat': 1.0, 'yhat_lower': 0.0, 'yhat_upper': 2.0})
+
+    monkeypatch.setattr(exportacao_lote, 'previsao_do_site', previsao)
+    status, corpo = _get(servidor, '/exportar?formato=zip')
+    assert status == 200
+    assert b'"erro"' not in corpo  # nada de JSON de erro colado no meio do ZIP
+
+
+@pytest.mark.parametrize('valor', ['abc', 'nan', 'inf', '-Infinity'])
+def test_parametro_rejeita_nao_finitos(valor):
+    with pytest.raises(ValueError, match=f"Parâmetro inválido: lat={valor}"):
+        api_servico._parametro({'lat': [valor]}, 'lat', float)
+    assert api_servico._parametro({'lat': ['-23.5']}, 'lat', float) == -23.5
+
+
+def test_serie_com_lat_nan_responde_400(servidor):
+    status, corpo = _get(servidor, '/serie?gas=NO2&lat=nan&lon=-46.6')
+    assert status == 400
+    assert json.loads(corpo)['erro'] == "Parâmetro inválido: lat=nan"
+
+
+def test_ee_indisponivel_responde_503():
+    class FonteSemEE(api_servico.FonteFake):
+        def get_data(self, lat, lon, gas_type):
+            raise inicializacao.EEInicializando("Earth Engine ainda inicializando.")
+
+    servidor = api_servico.criar_servidor(api_servico.ServicoCarbonCast(fonte=FonteSemEE()), '127.0.0.1', 0)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    try:
+        status, corpo = _get(servidor, '/serie?gas=NO2&lat=-23.5&lon=-46.6')
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+    assert status == 503
+    assert 'inicializando' in json.loads(corpo)['erro']
+
+
+def _em_paralelo(n, funcao):
+    barreira = threading.Barrier(n)
+    resultados = [None] * n
+
+    def rodar(i):
+        barreira.wait()
+        try:
+            resultados[i] = funcao(i)
+        except Exception as e:
+            resultados[i] = e
+
+    threads = [threading.Thread(target=rodar, args=(i,)) for i in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return resultados
+
+
+def test_single_flight_uma_busca_por_celula():
+    fonte = api_servico.FonteFake(atraso=0.3)
+    servico = api_servico.ServicoCarbonCast(fonte=fonte)
+    # Coordenadas diferentes dentro da mesma célula do NO2
+    resultados = _em_paralelo(8, lambda i: servico.serie('NO2', -23.56 + 0.001 * i, -46.63))
+
+    assert fonte.chamadas == 1
+    assert all(isinstance(r, tuple) and len(r[0]) > 0 for r in resultados)
+    assert servico.voos._em_voo == {}
+
+
+def test_single_flight_propaga_erro_a_todos_e_limpa():
+    voos = api_servico.SingleFlight()
+    chamadas = []
+
+    def falhar():
+        chamadas.append(1)
+        threading.Event().wait(0.3)
+        raise ConnectionError("EE fora do ar")
+
+    resultados = _em_paralelo(6, lambda i: voos.executar('chave', falhar))
+    assert len(chamadas) == 1
+    assert all(isinstance(r, ConnectionError) for r in resultados)
+    assert voos._em_voo == {}
+    assert voos.executar('chave', lambda: 42) == 42  # chave liberada: nova execução
+
+
+def test_servico_le_artefatos_antes_da_fonte(tmp_path):
+    ds = pd.date_range('2024-01-01', periods=10, freq='D')
+    serie = pd.DataFrame({'ds': ds, 'y': 1.0})
+    previsao = pd.DataFrame({'ds': ds, 'yhat': 2.0, 'yhat_lower': 1.0, 'yhat_upper': 3.0})
+    artefatos.salvar('NO2', -23.55, -46.63, serie, serie, previsao, meta={'band': 'banda_x'}, pasta=str(tmp_path))
+
+    fonte = api_servico.FonteFake()
+
+    def previsor(*args):
+        raise AssertionError("não deveria rodar o Prophet")
+
+    servico = api_servico.ServicoCarbonCast(fonte=fonte, previsor=previsor, pasta_artefatos=str(tmp_path))
+    df, band = servico.serie('NO2', -23.55, -46.63)
+    assert band == 'banda_x' and len(df) == 10
+    assert (servico.previsao('NO2', -23.55, -46.63)['yhat'] == 2.0).all()
+    assert fonte.chamadas == 0
+
+    servico.serie('NO2', -10.0, -50.0)  # sem artefato: cai na fonte ao vivo
+    assert fonte.chamadas == 1
@@ -0,0 +1,75 @@
+import datetime
+import json
+import os
+import threading
+
+import pandas as pd
+
+import artefatos
+
+
+def _quadros(valor=1.0):
+    ds = pd.date_range('2024-01-01', periods=3, freq='D')
+    serie = pd.DataFrame({'ds': ds, 'y': [valor] * 3})
+    ndvi = pd.DataFrame({'ds': ds, 'ndvi': [0.5] * 3})
+    previsao = pd.DataFrame({'ds': ds, 'yhat': [valor] * 3, 'yhat_lower': [0.0] * 3,
+                             'yhat_upper': [2.0] * 3, 'trend': [valor] * 3})
+    return serie, ndvi, previsao
+
+
+def test_salvar_e_carregar(tmp_path):
+    artefatos.salvar('NO2', -23.55, -46.63, *_quadros(), meta={'site': 'A'}, pasta=str(tmp_path))
+    artefato = artefatos.carregar('NO2', -23.55, -46.63, pasta=str(tmp_path))
+
+    assert artefato['meta']['site'] == 'A'
+    assert list(artefato['previsao'].columns) == artefatos.COLUNAS_PREVISAO
+    assert artefatos.carregar('CH4', -23.55, -46.63, pasta=str(tmp_path)) is None
+    assert [meta['site'] for meta in artefatos.listar(str(tmp_path))] == ['A']
+
+
+def test_regravar_mantem_um_artefato_legivel(tmp_path):
+    pasta = str(tmp_path)
+    primeira = artefatos.salvar('NO2', -23.55, -46.63, *_quadros(1.0), pasta=pasta)
+    segunda = artefatos.salvar('NO2', -23.55, -46.63, *_quadros(2.0), pasta=pasta)
+
+    assert primeira != segunda and os.path.isdir(primeira)  # a anterior fica para leitores em curso
+    assert artefatos.carregar('NO2', -23.55, -46.63, pasta=pasta)['serie']['y'].iloc[0] == 2.0
+
+    os.utime(primeira, (0, 0))
+    artefatos.salvar('NO2', -23.55, -46.63, *_quadros(3.0), pasta=pasta)
+    assert not os.path.exists(primeira)
+    assert len(list(artefatos.listar(pasta))) == 1
+
+
+def test_gravadores_simultaneos(tmp_path):
+    pasta = str(tmp_path)
+    erros = []
+
+    def gravar(valor):
+        try:
+            artefatos.salvar('NO2', -23.55, -46.63, *_quadros(valor), pasta=pasta)
+        except Exception as e:  # pragma: no cover - só em caso de falha
+            erros.append(e)
+
+    threads = [threading.Thread(target=gravar, args=(float(i),)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not erros
+    assert artefatos.carregar('NO2', -23.55, -46.63, pasta=pasta)['serie']['y'].iloc[0] in range(8)
+
+
+def test_carregar_respeita_idade_maxima(tmp_path):
+    pasta = str(tmp_path)
+    versao = artefatos.salvar('NO2', -23.55, -46.63, *_quadros(), pasta=pasta)
+    caminho = os.path.join(versao, 'meta.json')
+    with open(caminho, encoding='utf-8') as f:
+        meta = json.load(f)
+    meta['atualizado'] = (datetime.datetime.now() - datetime.timedelta(hours=50)).isoformat(timespec='seconds')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    assert artefatos.carregar('NO2', -23.55, -46.63, max_idade_h=artefatos.MAX_IDADE_H, pasta=pasta) is None
+    assert artefatos.carregar('NO2', -23.55, -46.63, pasta=pasta) is not None
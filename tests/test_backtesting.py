@@ -0,0 +1,82 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backtesting
+
+
+@pytest.fixture(autouse=True)
+def cache_temporario(tmp_path, monkeypatch):
+    monkeypatch.setattr(backtesting, 'PASTA_CACHE', str(tmp_path))
+
+
+def _serie(inicio='2022-01-01', dias=900):
+    ds = pd.date_range(inicio, periods=dias, freq='D')
+    return pd.DataFrame({'ds': ds, 'y': 10 + np.sin(np.arange(dias) / 20.0)})
+
+
+def test_gerar_cortes_respeita_treino_minimo_e_horizonte():
+    df = _serie(dias=900)
+    cortes = backtesting.gerar_cortes(df, horizonte_dias=90, periodo_dias=90, treino_min_dias=365)
+    assert cortes[0] == df['ds'].min() + pd.Timedelta(days=365)
+    assert all(c <= df['ds'].max() - pd.Timedelta(days=90) for c in cortes)
+    assert all(b - a == pd.Timedelta(days=90) for a, b in zip(cortes, cortes[1:]))
+    assert backtesting.gerar_cortes(_serie(dias=100)) == []
+
+
+def test_fold_sem_teste_por_lacuna_nao_quebra():
+    df = _serie(dias=900)
+    corte = pd.Timestamp('2023-06-01')
+    lacuna = (df['ds'] > corte) & (df['ds'] <= corte + pd.Timedelta(days=120))
+    tarefa = backtesting.preparar_fold('s', 'NO2', 'ingenuo_sazonal', corte, 90, df[~lacuna])
+    resultado = backtesting.executar_fold(tarefa)
+    assert resultado.empty
+    assert 'horizonte' in resultado.columns
+
+
+def test_fold_calcula_e_reaproveita_cache():
+    chamadas = []
+
+    def motor_contador(treino, datas, **_):
+        chamadas.append(len(treino))
+        return backtesting.motor_ingenuo_sazonal(treino, datas)
+
+    backtesting.registrar_motor('contador', motor_contador)
+    df = _serie(dias=900)
+    tarefas = [backtesting.preparar_fold('s', 'NO2', 'contador', c, 90, df)
+               for c in backtesting.gerar_cortes(df)]
+    with ThreadPoolExecutor(2) as executor:
+        primeira = backtesting.rodar_folds(tarefas, executor)
+        segunda = backtesting.rodar_folds(tarefas, executor)
+
+    assert len(chamadas) == len(tarefas)
+    assert all(len(p) == 90 and p['horizonte'].between(1, 90).all() for p in primeira)
+    pd.testing.assert_frame_equal(primeira[0], segunda[0])
+
+
+def test_tarefa_leva_so_as_fatias_do_fold():
+    df = _serie(dias=900)
+    corte = pd.Timestamp('2023-03-01')
+    tarefa = backtesting.preparar_fold('s', 'NO2', 'ingenuo_sazonal', corte, 30, df)
+    assert tarefa['treino']['ds'].max() <= corte
+    assert len(tarefa['teste']) == 30
+    assert 'df' not in tarefa
+
+
+def test_prophet_app_usa_os_parametros_ajustados_da_regiao(tmp_path, monkeypatch):
+    import ajuste_hiperparametros
+
+    arquivo = str(tmp_path / 'parametros.json')
+    monkeypatch.setattr(ajuste_hiperparametros, 'ARQUIVO_PARAMETROS', arquivo)
+    ajuste_hiperparametros.salvar_parametros(
+        'NO2', ajuste_hiperparametros.bucket_regiao(-23.5, -46.6), {'changepoint_prior_scale': 0.5}, 0.1)
+
+    df = _serie(dias=900)
+    corte = backtesting.gerar_cortes(df)[0]
+    tarefa = backtesting.preparar_fold('s', 'NO2', 'prophet_app', corte, 90, df, coordenadas=(-23.5, -46.6))
+    assert tarefa['parametros']['changepoint_prior_scale'] == 0.5
+    assert tarefa['parametros']['weekly_seasonality'] is True
+    sem_ajuste = backtesting.preparar_fold('s', 'NO2', 'prophet_app', corte, 90, df)
+    assert sem_ajuste['chave'] != tarefa['chave']
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+import cache_espacial
+
+
+def _serie(valor, dias=5):
+    return pd.DataFrame({'ds': pd.date_range('2024-01-01', periods=dias, freq='D'), 'y': float(valor)}), 'banda'
+
+
+class _Busca:
+    def __init__(self, resultado=None):
+        self.chamadas = []
+        self.resultado = resultado
+
+    def __call__(self, lat, lon, gas):
+        self.chamadas.append((lat, lon, gas))
+        return self.resultado if self.resultado is not None else _serie(len(self.chamadas))
+
+
+def test_tamanho_e_ajuste_a_grade():
+    assert cache_espacial.tamanho_celula('NO2') == pytest.approx(0.03)   # 3000 m na grade de 0,01°
+    assert cache_espacial.tamanho_celula('CH4') == pytest.approx(0.05)   # 5000 m
+    assert cache_espacial.tamanho_celula('NDVI') == pytest.approx(0.01)  # 1000 m na grade de 0,0025°
+
+    assert cache_espacial.celula(-23.551, -46.633, 'NO2') == (-786, -1555)
+    assert cache_espacial.ajustar_a_grade(-23.551, -46.633, 'NO2') == (-23.565, -46.635)
+    assert cache_espacial.celula(-23.552, -46.621, 'NO2') == cache_espacial.celula(-23.551, -46.633, 'NO2')
+
+
+def test_cliques_proximos_reaproveitam_a_serie():
+    indice, busca = cache_espacial.IndiceEspacial(), _Busca()
+    cache_espacial.get_data(-23.551, -46.633, 'NO2', indice=indice, buscar=busca)
+    df, _ = cache_espacial.get_data(-23.552, -46.621, 'NO2', indice=indice, buscar=busca)
+
+    assert busca.chamadas == [(-23.565, -46.635, 'NO2')]  # busca no centro da célula, uma vez
+    assert indice.acertos == 1 and len(df) == 5
+    assert cache_espacial.em_cache(-23.56, -46.63, 'NO2', indice=indice)
+
+
+def test_interpolar_idw_pesa_pelo_inverso_do_quadrado():
+    lado = cache_espacial.tamanho_celula('NO2')
+    lat, lon = cache_espacial.centro_celula(0, 0, 'NO2')
+    vizinhos = [(0, 1, _serie(10)[0]), (0, -2, _serie(40)[0]), (1, 0, pd.DataFrame(columns=['ds', 'y']))]
+    df = cache_espacial.interpolar_idw(lat, lon, vizinhos, 'NO2')
+    # distâncias 1 e 2 células -> pesos 1 e 1/4
+    assert df['y'].iloc[0] == pytest.approx((10 * 1 + 40 / 4) / (1 + 1 / 4))
+    assert len(df) == 5 and lado > 0
+
+
+def test_interpolar_usa_vizinhos_e_busca_se_todos_vazios():
+    indice, busca = cache_espacial.IndiceEspacial(), _Busca()
+    linha, coluna = cache_espacial.celula(-23.551, -46.633, 'NO2')
+    lat, lon = cache_espacial.centro_celula(linha, coluna, 'NO2')
+
+    indice.guardar('NO2', linha, coluna + 1, (pd.DataFrame(columns=['ds', 'y']), 'banda'))  # oceano / falha
+    df, _ = cache_espacial.get_data(lat, lon, 'NO2', interpolar=True, indice=indice, buscar=busca)
+    assert len(busca.chamadas) == 1 and not df.empty
+
+    indice.guardar('NO2', linha + 1, coluna + 1, _serie(7))
+    df, _ = cache_espacial.get_data(lat + 0.06, lon + 0.03, 'NO2', interpolar=True, indice=indice, buscar=busca)
+    assert len(busca.chamadas) == 1  # vizinho com dados: interpolado, sem nova busca
+    assert (df['y'] == 7).all()
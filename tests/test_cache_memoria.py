@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+import cache_memoria
+
+
+def _previsao(n=100):
+    ds = pd.date_range('2024-01-01', periods=n, freq='D')
+    return pd.DataFrame({'ds': ds.astype(str), 'yhat': np.arange(n, dtype='float64'), 'yhat_lower': 0.0,
+                         'yhat_upper': 1.0, 'trend': 0.0, 'weekly': 0.0})
+
+
+def test_compactar_previsao():
+    compacto = cache_memoria.compactar_previsao(_previsao())
+    assert list(compacto.columns) == cache_memoria.COLUNAS_PREVISAO
+    assert compacto['ds'].dtype == 'datetime64[ns]'
+    assert compacto['yhat'].dtype == np.float32
+
+
+def test_despeja_o_menos_usado_quando_estoura_o_orcamento():
+    tamanho = cache_memoria.tamanho_bytes(cache_memoria.compactar(_previsao()))
+    cache = cache_memoria.CacheOrcado(max_bytes=2.5 * tamanho)
+    cache.guardar('a', _previsao())
+    cache.guardar('b', _previsao())
+    assert cache.obter('a') is not None  # 'a' passa a ser o mais recente
+    cache.guardar('c', _previsao())
+
+    assert cache.contem('a') and cache.contem('c') and not cache.contem('b')
+    assert cache.despejos == 1 and cache.bytes <= cache.max_bytes
+    assert cache.uso()['entradas'] == 2
+
+
+def test_valor_maior_que_o_orcamento_nao_e_guardado():
+    cache = cache_memoria.CacheOrcado(max_bytes=100)
+    valor = cache.guardar('grande', _previsao())
+    assert len(valor) == 100 and len(cache) == 0 and cache.bytes == 0
+
+
+def test_ttl_e_taxa_de_acerto(monkeypatch):
+    agora = [1000.0]
+    monkeypatch.setattr(cache_memoria.time, 'time', lambda: agora[0])
+    cache = cache_memoria.CacheOrcado(max_bytes=10 ** 7, ttl=60)
+    cache.guardar(('NO2', 1, 2), (_previsao(), 'banda'))
+
+    df, band = cache.obter(('NO2', 1, 2))
+    assert band == 'banda' and df['yhat'].dtype == np.float32
+    agora[0] += 61
+    assert cache.valor_se_valido(('NO2', 1, 2)) is None
+    assert cache.obter(('NO2', 1, 2)) is None
+    assert len(cache) == 0 and cache.bytes == 0
+    assert cache.taxa_acerto() == 0.5
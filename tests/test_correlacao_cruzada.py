@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlacao_cruzada
+
+
+def _forca_bruta(a, b, lag):
+    """Pearson só nos t em que a[t] e b[t + lag] existem."""
+    pares = [(a[t], b[t + lag]) for t in range(len(a))
+             if 0 <= t + lag < len(b) and not np.isnan(a[t]) and not np.isnan(b[t + lag])]
+    x, y = np.array(pares).T
+    return np.corrcoef(x, y)[0, 1]
+
+
+def test_correlacao_defasada_igual_a_forca_bruta():
+    rng = np.random.default_rng(0)
+    a, b = rng.normal(size=(3, 50)), rng.normal(size=(3, 50))
+    lags, corr = correlacao_cruzada.correlacao_defasada(a, b, 5)
+
+    assert list(lags) == list(range(-5, 6))
+    for i in range(3):
+        assert corr[i, 5] == pytest.approx(np.corrcoef(a[i], b[i])[0, 1])
+        for j, lag in enumerate(lags):
+            assert corr[i, j] == pytest.approx(_forca_bruta(a[i], b[i], lag))
+
+
+def test_correlacao_defasada_com_pontas_sem_dado():
+    rng = np.random.default_rng(3)
+    a, b = rng.normal(size=(2, 40)), rng.normal(size=(2, 40))
+    a[0, :15] = np.nan
+    b[0, 30:] = np.nan
+    b[1, :] = np.nan
+    lags, corr = correlacao_cruzada.correlacao_defasada(a, b, 3)
+    for j, lag in enumerate(lags):
+        assert corr[0, j] == pytest.approx(_forca_bruta(a[0], b[0], lag))
+    assert np.isnan(corr[1]).all()
+
+
+def test_correlacao_defasada_recupera_atraso_e_serie_constante():
+    rng = np.random.default_rng(1)
+    x = rng.normal(size=200)
+    b = np.roll(x, 4)  # b[t + 4] = x[t]: a poluição antecede em 4 períodos
+    lags, corr = correlacao_cruzada.correlacao_defasada(np.vstack([x, np.ones(200)]), np.vstack([b, b]), 10)
+    assert lags[np.argmax(corr[0])] == 4
+    assert np.isnan(corr[1]).all()
+
+    lags, _ = correlacao_cruzada.correlacao_defasada(x[None, :5], b[None, :5], 10)
+    assert list(lags) == list(range(-4, 5))  # max_lag limitado a n - 1
+
+
+def test_analisar_carteira_ranqueia_e_respeita_minimo():
+    ds = pd.date_range('2023-01-01', periods=60, freq='W')
+    rng = np.random.default_rng(2)
+    base = rng.normal(size=60)
+    poluicao = {'forte': pd.DataFrame({'ds': ds, 'y': base}),
+                'curta': pd.DataFrame({'ds': ds[:10], 'y': base[:10]})}
+    ndvi = {'forte': pd.DataFrame({'ds': ds, 'ndvi': -np.roll(base, 2)}),
+            'curta': pd.DataFrame({'ds': ds[:10], 'ndvi': base[:10]})}
+
+    resultado = correlacao_cruzada.analisar_carteira(poluicao, ndvi, max_lag=4, min_periodos=20)
+    assert list(resultado['site']) == ['forte', 'curta']
+    assert resultado.loc[0, 'melhor_lag'] == 2 and resultado.loc[0, 'correlacao'] < -0.9
+    assert np.isnan(resultado.loc[1, 'correlacao'])
+
+
+def test_site_curto_na_carteira_igual_a_sozinho():
+    rng = np.random.default_rng(4)
+    longo = pd.date_range('2020-01-05', periods=200, freq='W')
+    curto = longo[150:190]
+    base = rng.normal(size=200)
+    poluicao = {'longo': pd.DataFrame({'ds': longo, 'y': base}),
+                'curto': pd.DataFrame({'ds': curto, 'y': rng.normal(size=40)})}
+    ndvi = {'longo': pd.DataFrame({'ds': longo, 'ndvi': base + 0.5 * rng.normal(size=200)}),
+            'curto': pd.DataFrame({'ds': curto, 'ndvi': rng.normal(size=40)})}
+
+    carteira = correlacao_cruzada.analisar_carteira(poluicao, ndvi, max_lag=4, min_periodos=20).set_index('site')
+    sozinho = correlacao_cruzada.analisar_carteira({'curto': poluicao['curto']}, {'curto': ndvi['curto']},
+                                                  max_lag=4, min_periodos=20).set_index('site')
+
+    assert carteira.loc['curto', 'correlacao'] == pytest.approx(sozinho.loc['curto', 'correlacao'])
+    assert carteira.loc['curto', 'n_periodos'] == 40
+    assert carteira.index[0] == 'longo'
@@ -0,0 +1,67 @@
+import datetime
+
+import pandas as pd
+import pytest
+
+import artefatos
+import daemon_precomputo
+import dados_satelite
+
+
+def test_interpretar_agenda():
+    agenda = daemon_precomputo.interpretar_agenda("*/15 2-4 1,15 * 1-5")
+    assert agenda['minuto'] == {0, 15, 30, 45}
+    assert agenda['hora'] == {2, 3, 4}
+    assert agenda['dia'] == {1, 15}
+    assert agenda['mes'] == set(range(1, 13))
+    assert agenda['semana'] == {0, 1, 2, 3, 4}  # segunda a sexta no weekday() do Python
+
+    assert daemon_precomputo.interpretar_agenda("0 3 * * 0,7")['semana'] == {6}
+    with pytest.raises(ValueError):
+        daemon_precomputo.interpretar_agenda("0 3 * *")
+
+
+def test_proxima_execucao():
+    agenda = daemon_precomputo.interpretar_agenda(daemon_precomputo.AGENDA_PADRAO)
+    assert daemon_precomputo.proxima_execucao(agenda, datetime.datetime(2024, 5, 10, 2, 59, 30)) == \
+        datetime.datetime(2024, 5, 10, 3, 0)
+    assert daemon_precomputo.proxima_execucao(agenda, datetime.datetime(2024, 5, 10, 3, 0)) == \
+        datetime.datetime(2024, 5, 11, 3, 0)
+
+    dias_uteis = daemon_precomputo.interpretar_agenda("30 2 * * 1-5")
+    sexta = datetime.datetime(2024, 5, 10, 12, 0)
+    assert daemon_precomputo.proxima_execucao(dias_uteis, sexta) == datetime.datetime(2024, 5, 13, 2, 30)
+    assert daemon_precomputo.maior_intervalo_h(dias_uteis, sexta) == 72
+    assert daemon_precomputo.maior_intervalo_h(agenda, sexta) <= artefatos.MAX_IDADE_H
+
+
+def test_proxima_execucao_dia_ou_semana():
+    # Como no cron: com dia do mês E dia da semana restritos, basta um dos dois.
+    agenda = daemon_precomputo.interpretar_agenda("0 3 1 * 1")
+    assert agenda['dia_ou_semana']
+    assert daemon_precomputo.proxima_execucao(agenda, datetime.datetime(2024, 5, 10, 12, 0)) == \
+        datetime.datetime(2024, 5, 13, 3, 0)  # segunda
+    assert daemon_precomputo.proxima_execucao(agenda, datetime.datetime(2024, 5, 28, 12, 0)) == \
+        datetime.datetime(2024, 6, 1, 3, 0)  # dia 1, um sábado
+
+    # Com um dos campos começando por '*', vale o E (aqui: dias ímpares que caem no domingo).
+    impares = daemon_precomputo.interpretar_agenda("0 3 */2 * 0")
+    assert not impares['dia_ou_semana']
+    assert daemon_precomputo.proxima_execucao(impares, datetime.datetime(2024, 5, 10, 12, 0)) == \
+        datetime.datetime(2024, 5, 19, 3, 0)
+
+
+def test_rodar_rodada_grava_na_pasta(tmp_path, monkeypatch):
+    ds = pd.date_range('2024-01-01', periods=10, freq='D')
+    monkeypatch.setattr(dados_satelite, 'get_data',
+                        lambda lat, lon, gas: (pd.DataFrame({'ds': ds, 'y': range(10)}), 'banda'))
+    monkeypatch.setattr(dados_satelite, 'get_ndvi', lambda lat, lon: pd.DataFrame({'ds': ds, 'ndvi': 0.5}))
+    monkeypatch.setattr(dados_satelite, 'run_forecast', lambda df, *args: df.assign(
+        yhat=df['y'], yhat_lower=df['y'], yhat_upper=df['y']))
+    watchlist = pd.DataFrame({'site': ['A', 'B'], 'gas': ['NO2', 'XYZ'], 'lat': [-23.5, -22.9], 'lon': [-46.6, -43.2]})
+
+    relatorio = daemon_precomputo.rodar_rodada(watchlist, max_workers=2, pasta=str(tmp_path))
+
+    assert list(relatorio['status']) == ['ok', 'falha']
+    assert artefatos.carregar('NO2', -23.5, -46.6, pasta=str(tmp_path))['meta']['site'] == 'A'
+    assert (tmp_path / daemon_precomputo.ARQUIVO_RELATORIO).exists()
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import detector_anomalias
+
+
+def _leituras(n=600, site='s1', semente=0):
+    rng = np.random.default_rng(semente)
+    y = 10 + rng.normal(0, 1, n)
+    y[400] = 30.0
+    return pd.DataFrame({'site': site, 'ds': pd.date_range('2024-01-01', periods=n, freq='h'), 'y': y})
+
+
+def test_quantil_p2_aproxima_o_quantil():
+    rng = np.random.default_rng(1)
+    dados = rng.normal(0, 1, 20_000)
+    estimador = detector_anomalias.QuantilP2(0.99)
+    for x in dados:
+        estimador.atualizar(x)
+    assert estimador.valor() == pytest.approx(np.quantile(dados, 0.99), abs=0.1)
+
+
+def test_quantil_janela_acompanha_mudanca_de_nivel():
+    janela = detector_anomalias.QuantilJanela(0.5, janela=200)
+    cumulativo = detector_anomalias.QuantilP2(0.5)
+    for x in np.r_[np.zeros(1000), np.full(500, 100.0)]:
+        janela.atualizar(x)
+        cumulativo.atualizar(x)
+    assert janela.valor() == pytest.approx(100.0)
+    assert cumulativo.valor() < 50
+
+
+def test_detecta_pico():
+    alertas = detector_anomalias.DetectorStream().processar_lote(_leituras())
+    picos = alertas[alertas['tipo'] == 'pico_alta']
+    assert list(picos['ds']) == [pd.Timestamp('2024-01-01') + pd.Timedelta(hours=400)]
+
+
+def test_retomar_estado_nao_reemite_alertas(tmp_path):
+    leituras = _leituras()
+    detector = detector_anomalias.DetectorStream()
+    primeira = detector.processar_lote(leituras.iloc[:500])
+    caminho = tmp_path / 'estado.pkl'
+    detector.salvar(caminho)
+
+    retomado = detector_anomalias.DetectorStream.carregar(caminho)
+    n = retomado.sites['s1'].n
+    segunda = retomado.processar_lote(leituras)  # o arquivo inteiro de novo, como no CLI
+    assert not primeira.empty
+    assert segunda.empty or (segunda['ds'] > leituras['ds'].iloc[499]).all()
+    assert retomado.sites['s1'].n == n + 100
+
+
+def test_granulos_da_mesma_data_sao_todos_processados(tmp_path):
+    # O S5P devolve vários grânulos por data: todos entram, mas o replay não os repete.
+    ds = pd.to_datetime(['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-02', '2024-01-03'])
+    leituras = pd.DataFrame({'site': 's1', 'ds': ds, 'y': [1.0, 2.0, 3.0, 4.0, 5.0]})
+    detector = detector_anomalias.DetectorStream()
+    detector.processar_lote(leituras.iloc[:3])
+    assert detector.sites['s1'].n == 3
+
+    caminho = tmp_path / 'estado.pkl'
+    detector.salvar(caminho)
+    retomado = detector_anomalias.DetectorStream.carregar(caminho)
+    retomado.processar_lote(leituras)
+    assert retomado.sites['s1'].n == 5
@@ -0,0 +1,40 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import extracao_progressiva
+
+
+def _serie(n, freq):
+    return pd.DataFrame({'ds': pd.date_range('2022-01-01', periods=n, freq=freq), 'y': np.arange(n, dtype=float)})
+
+
+def test_completa_roda_enquanto_a_previa_e_buscada():
+    iniciou = threading.Event()
+
+    def completo(lat, lon, gas):
+        iniciou.set()
+        return _serie(100, 'D'), 'banda'
+
+    def grosso(lat, lon, gas):
+        assert iniciou.wait(5), "a busca completa deveria começar antes da prévia terminar"
+        return _serie(12, 'MS'), 'banda'
+
+    etapas = list(extracao_progressiva.extrair_progressivo(-23.5, -46.6, 'NO2', completo, grosso))
+    assert [(etapa, len(df)) for etapa, df, _ in etapas] == [('grosso', 12), ('completo', 100)]
+
+
+def test_previa_com_erro_nao_derruba_a_completa():
+    def grosso(lat, lon, gas):
+        raise RuntimeError("timeout no EE")
+
+    etapas = list(extracao_progressiva.extrair_progressivo(
+        -23.5, -46.6, 'NO2', lambda *a: (_serie(10, 'D'), 'banda'), grosso))
+    assert etapas[0][1].empty and len(etapas[1][1]) == 10
+
+
+def test_tendencia_preliminar():
+    hoje, futuro, delta = extracao_progressiva.tendencia_preliminar(_serie(24, 'MS').assign(y=lambda d: 100.0))
+    assert hoje == pytest.approx(100) and futuro == pytest.approx(100) and delta == pytest.approx(0, abs=1e-9)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import fusao_temporal as fusao
+
+
+@pytest.fixture
+def arquivos(tmp_path):
+    """Duas estações horárias de 10 dias: no2 = hora do dia (+100 na estação 'b')."""
+    horas = pd.date_range('2023-01-01', periods=24 * 10, freq='h')
+    caminhos = {}
+    for estacao, deslocamento in (('est', 0.0), ('b', 100.0)):
+        caminho = tmp_path / f"{estacao}.csv"
+        pd.DataFrame({'data_hora': horas, 'no2': horas.hour + deslocamento}).to_csv(caminho, index=False)
+        caminhos[estacao] = str(caminho)
+    return caminhos
+
+
+def _satelite(estacoes):
+    dias = pd.date_range('2023-01-02', periods=5, freq='D')
+    return fusao.series_satelite({e: pd.DataFrame({'ds': dias, 'y': np.arange(5.0)}) for e in estacoes})
+
+
+def test_ler_estacoes_categorica_e_float32(arquivos):
+    terra = fusao.ler_estacoes(arquivos, ['no2'], tamanho_bloco=50)
+    assert isinstance(terra['estacao'].dtype, pd.CategoricalDtype)
+    assert terra['no2'].dtype == np.float32
+    assert len(terra) == 2 * 24 * 10
+
+
+@pytest.mark.parametrize('modo', ['janela', 'asof'])
+def test_satelite_cobrindo_so_parte_das_estacoes(arquivos, modo):
+    terra = fusao.ler_estacoes(arquivos, ['no2'])
+    tabela = fusao.tabela_calibracao(terra, _satelite(['est']), 'no2', modo)
+    assert len(tabela) == 5
+    assert set(tabela['estacao']) == {'est'}
+
+
+def test_janela_e_asof_em_torno_da_passagem(arquivos):
+    terra = fusao.ler_estacoes(arquivos, ['no2'])
+    satelite = _satelite(['est', 'b'])
+    janela = fusao.juntar_janela(terra, satelite, 'no2', antes='1h', depois='1h', hora_passagem='13:00')
+    # Leituras das 12h, 13h e 14h -> média 13
+    assert np.allclose(janela.loc[janela['estacao'] == 'est', 'terra'], 13.0)
+    assert (janela['n_leituras'] == 3).all()
+
+    asof = fusao.juntar_asof(terra, satelite, 'no2', tolerancia='30min', hora_passagem='13:30')
+    assert np.allclose(asof.loc[asof['estacao'] == 'b', 'terra'], 113.0)
+
+
+def test_resumo_em_blocos_igual_ao_reamostrado(arquivos):
+    em_blocos = fusao.resumir_em_blocos(arquivos, 'D', ['no2'], tamanho_bloco=7)
+    inteiro = fusao.reamostrar(fusao.ler_estacoes(arquivos, ['no2']), 'D')
+    juntos = em_blocos.merge(inteiro, on=['estacao', 'ds'], suffixes=('_blocos', '_inteiro'))
+    assert len(juntos) == 20
+    assert np.allclose(juntos['no2_blocos'], juntos['no2_inteiro'])
+    assert np.allclose(juntos['no2_blocos'], 11.5 + np.where(juntos['estacao'] == 'b', 100, 0))
@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+import pytest
+
+import hotspots
+
+
+@pytest.fixture
+def consultas(tmp_path, monkeypatch):
+    monkeypatch.setattr(hotspots, 'PASTA_CACHE', str(tmp_path))
+    monkeypatch.setattr(hotspots, 'ultima_imagem', lambda chave_gas: '2024-05-10')
+    hotspots._memoria.limpar()
+    chamadas = []
+
+    def consultar(bbox, chave_gas, inicio, fim, top_n):
+        chamadas.append((bbox, inicio, fim))
+        return pd.DataFrame({'posicao': [1], 'lat': [bbox[1]], 'lon': [bbox[0]], 'valor': [1.0]})
+
+    monkeypatch.setattr(hotspots, '_consultar', consultar)
+    return chamadas
+
+
+def test_caixas_na_mesma_celula_e_periodo_pela_ultima_imagem(consultas):
+    hotspots.varrer_hotspots((-46.6012, -23.5534, -46.3047, -23.3011), 'NO2')
+    hotspots.varrer_hotspots((-46.6049, -23.5502, -46.3001, -23.3088), 'NO2')
+
+    assert len(consultas) == 1
+    bbox, inicio, fim = consultas[0]
+    assert bbox == (-46.62, -23.58, -46.29, -23.28)  # célula do NO2: 0,03°
+    assert (inicio, fim) == ('2024-04-11', '2024-05-11')
+
+
+def test_cache_em_disco_expira_e_tem_limite(consultas, monkeypatch):
+    monkeypatch.setattr(hotspots, 'MAX_ARQUIVOS_DISCO', 2)
+    for oeste in (-48.0, -47.0, -46.0):
+        hotspots.varrer_hotspots((oeste, -24.0, oeste + 0.5, -23.5), 'CH4')
+    assert len(os.listdir(hotspots.PASTA_CACHE)) == 2
+
+    hotspots._memoria.limpar()
+    for nome in os.listdir(hotspots.PASTA_CACHE):
+        os.utime(os.path.join(hotspots.PASTA_CACHE, nome), (0, 0))
+    hotspots.varrer_hotspots((-46.0, -24.0, -45.5, -23.5), 'CH4')
+    assert len(consultas) == 4
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indice_aqi
+
+
+def _ug(ppb, poluente):
+    return np.asarray(ppb, dtype='float64') / indice_aqi._ppb(poluente)
+
+
+def test_subindice_nos_cortes_epa():
+    pm = indice_aqi.subindice([0.0, 9.0, 35.4, 55.45, 1000.0, np.nan], 'pm2_5')
+    np.testing.assert_allclose(pm[:5], [0, 50, 100, 150, 500], atol=1e-4)
+    assert np.isnan(pm[5])
+
+
+def test_o3_epa_oito_horas_ate_200_ppb_e_uma_hora_acima():
+    oito = indice_aqi.subindice(_ug([106, 200, 300], 'o3'), 'o3')
+    np.testing.assert_allclose(oito[:2], [201, 300], atol=1e-4)
+    assert np.isnan(oito[2])
+
+    uma = indice_aqi.subindice(_ug([100, 165, 205, 404, 405, 604], 'o3'), 'o3_1h')
+    assert np.isnan(uma[0])
+    np.testing.assert_allclose(uma[1:], [151, 201, 300, 301, 500], atol=0.6)
+
+
+def test_so2_epa_acima_de_304_ppb_usa_media_24h():
+    base = pd.Timestamp('2024-01-01')
+    df = pd.DataFrame({'data_hora': pd.date_range(base, periods=48, freq='h'),
+                       'so2': _ug(np.r_[np.full(24, 10.0), np.full(24, 700.0)], 'so2')})
+    resultado = indice_aqi.calcular_aqi(df)
+
+    # Primeira hora acima de 304 ppb: média de 24 h ainda baixa -> fica em 200
+    assert resultado['iqa_so2'].iloc[24] == pytest.approx(200)
+    # Média de 24 h toda em 700 ppb -> faixa 301-500
+    assert 301 <= resultado['iqa_so2'].iloc[-1] <= 500
+    assert (resultado['poluente_dominante'].dropna() == 'so2').all()
+
+
+def test_calcular_aqi_dominante_e_categoria_conama():
+    df = pd.DataFrame({'pm2_5': [10.0, 100.0, np.nan], 'no2': [250.0, 50.0, np.nan]})
+    resultado = indice_aqi.calcular_aqi(df, 'CONAMA', medias=False)
+    assert list(resultado['poluente_dominante'].astype(object)[:2]) == ['no2', 'pm2_5']
+    assert list(resultado['categoria'].astype(object)[:2]) == ['Ruim', 'Muito Ruim']
+    assert resultado['indice'].isna().iloc[2] and pd.isna(resultado['nivel'].iloc[2])
+
+
+def test_calcular_em_blocos_igual_ao_arquivo_inteiro(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 200
+    df = pd.DataFrame({'data_hora': pd.date_range('2024-01-01', periods=n, freq='h'),
+                       'pm2_5': rng.gamma(2.0, 15.0, n), 'pm10': rng.gamma(2.0, 25.0, n),
+                       'o3': rng.gamma(2.0, 40.0, n), 'no2': rng.gamma(2.0, 30.0, n),
+                       'so2': rng.gamma(2.0, 10.0, n), 'co': rng.gamma(2.0, 300.0, n)})
+    caminho = tmp_path / 'horario.csv'
+    df.to_csv(caminho, index=False)
+
+    inteiro = indice_aqi.calcular_aqi(pd.read_csv(caminho, parse_dates=['data_hora']))
+    blocos = pd.concat(indice_aqi.calcular_em_blocos(caminho, tamanho_bloco=37))
+    pd.testing.assert_frame_equal(blocos[inteiro.columns], inteiro)
@@ -0,0 +1,78 @@
+import sys
+import threading
+import types
+
+import pytest
+
+import inicializacao
+
+
+class _EEFalso(types.ModuleType):
+    def __init__(self, falhas=0, bloquear=None):
+        super().__init__('ee')
+        self.falhas = falhas
+        self.bloquear = bloquear
+        self.inicializacoes = 0
+        self.autenticacoes = 0
+
+    def Initialize(self):
+        self.inicializacoes += 1
+        if self.bloquear is not None:
+            self.bloquear.wait(5)
+        if self.inicializacoes <= self.falhas:
+            raise ConnectionError("falha transitória")
+
+    def Authenticate(self):
+        self.autenticacoes += 1
+
+
+@pytest.fixture
+def ee_falso(monkeypatch):
+    def instalar(**kwargs):
+        modulo = _EEFalso(**kwargs)
+        monkeypatch.setitem(sys.modules, 'ee', modulo)
+        return modulo
+
+    inicializacao._ee_pronto.clear()
+    monkeypatch.setitem(inicializacao._estado, 'thread', None)
+    yield instalar
+    thread = inicializacao._estado['thread']
+    if thread is not None:
+        thread.join(5)
+    inicializacao._ee_pronto.clear()
+
+
+def test_repete_initialize_sem_autenticar(ee_falso):
+    ee = ee_falso(falhas=2)
+    inicializacao.iniciar_ee_em_background(tentativas=4, espera_inicial=0.01, interativo=False)
+    assert inicializacao.obter_ee(timeout=5) is ee
+    assert ee.inicializacoes == 3 and ee.autenticacoes == 0
+    assert inicializacao.ee_pronto()
+
+
+def test_autentica_so_no_modo_interativo(ee_falso):
+    ee = ee_falso(falhas=1)
+    inicializacao.iniciar_ee_em_background(tentativas=3, espera_inicial=0.01, interativo=True)
+    inicializacao.obter_ee(timeout=5)
+    assert ee.autenticacoes == 1
+
+
+def test_tentativas_esgotadas(ee_falso):
+    ee = ee_falso(falhas=10)
+    inicializacao.iniciar_ee_em_background(tentativas=3, espera_inicial=0.01, interativo=False)
+    with pytest.raises(inicializacao.EEIndisponivel, match="falha transitória"):
+        inicializacao.obter_ee(timeout=5)
+    assert ee.inicializacoes == 3 and ee.autenticacoes == 0
+    assert inicializacao._estado['thread'] is None  # a próxima chamada dispara outra rodada
+
+
+def test_espera_limitada_enquanto_inicializa(ee_falso):
+    liberar = threading.Event()
+    ee_falso(bloquear=liberar)
+    inicializacao.iniciar_ee_em_background(tentativas=1, espera_inicial=0.01, interativo=False)
+    try:
+        with pytest.raises(inicializacao.EEInicializando):
+            inicializacao.obter_ee(timeout=0.2)
+    finally:
+        liberar.set()
+    assert inicializacao.obter_ee(timeout=5) is sys.modules['ee']
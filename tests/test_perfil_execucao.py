@@ -0,0 +1,93 @@
+import importlib.util
+import threading
+import time
+
+import pytest
+
+import perfil_execucao
+
+
+@pytest.fixture(autouse=True)
+def pasta_temporaria(tmp_path, monkeypatch):
+    monkeypatch.setattr(perfil_execucao, 'PASTA_PERFIS', str(tmp_path))
+    monkeypatch.setattr(perfil_execucao, 'MAX_PERFIS', 2)
+
+
+def _trabalho():
+    return sum(i * i for i in range(10_000))
+
+
+def test_um_perfil_por_vez_e_liberado_no_finally():
+    primeiro = perfil_execucao.PerfilExecucao()
+    assert primeiro.iniciar()
+    with pytest.raises(RuntimeError):
+        try:
+            assert not perfil_execucao.PerfilExecucao().iniciar()
+            raise RuntimeError("execução interrompida")
+        finally:
+            primeiro.finalizar(gas='NO2')
+
+    segundo = perfil_execucao.PerfilExecucao()
+    assert segundo.iniciar()
+    assert segundo.finalizar() is not None
+
+
+def test_rotacao_e_resumos():
+    for _ in range(3):
+        perfil = perfil_execucao.PerfilExecucao()
+        assert perfil.iniciar()
+        _trabalho()
+        caminho = perfil.finalizar(gas='CH4', lat=-23.5, lon=-46.6)
+
+    assert len(perfil_execucao.listar_perfis()) == 2
+    assert not perfil_execucao.top_funcoes(caminho, n=3).empty
+    assert perfil_execucao.tempo_por_componente(caminho)['tempo_s'].sum() >= 0
+
+
+def test_espera_em_builtin_vai_para_o_componente_do_chamador(tmp_path):
+    pacote = tmp_path / 'pacotes' / 'prophet'
+    pacote.mkdir(parents=True)
+    (pacote / '__init__.py').write_text(
+        "import time\n\ndef ajustar():\n    time.sleep(0.2)\n", encoding='utf-8')
+    # Carregado pelo caminho (sem entrar em sys.modules como 'prophet')
+    especificacao = importlib.util.spec_from_file_location('prophet_falso', pacote / '__init__.py')
+    prophet = importlib.util.module_from_spec(especificacao)
+    especificacao.loader.exec_module(prophet)
+
+    perfil = perfil_execucao.PerfilExecucao()
+    assert perfil.iniciar()
+    try:
+        prophet.ajustar()
+        time.sleep(0.05)  # espera direto no teste: sem componente
+    finally:
+        caminho = perfil.finalizar()
+
+    tempos = perfil_execucao.tempo_por_componente(caminho).set_index('componente')['tempo_s']
+    assert tempos['Prophet/Stan'] >= 0.15
+    assert tempos.get('Outros', 0.0) < 0.15
+
+
+def test_orfao_de_outra_thread_viva_nao_e_desligado(monkeypatch):
+    monkeypatch.setattr(perfil_execucao, 'TEMPO_ORFAO', 0)
+    pronto, liberar = threading.Event(), threading.Event()
+    perfis = []
+
+    def dono():
+        perfis.append(perfil_execucao.PerfilExecucao())
+        perfis[0].iniciar()
+        pronto.set()
+        liberar.wait(5)
+        perfis[0].finalizar()
+
+    thread = threading.Thread(target=dono)
+    thread.start()
+    pronto.wait(5)
+    try:
+        assert not perfil_execucao.PerfilExecucao().iniciar()
+        assert perfis[0].ativo
+    finally:
+        liberar.set()
+        thread.join()
+    novo = perfil_execucao.PerfilExecucao()
+    assert novo.iniciar()
+    novo.finalizar()
@@ -0,0 +1,38 @@
+import os
+
+import pandas as pd
+
+import serie_area
+
+QUADRADO = {'type': 'Polygon', 'coordinates': [[[-47.0, -24.0], [-46.0, -24.0], [-46.0, -23.2], [-47.0, -23.2], [-47.0, -24.0]]]}
+
+
+def test_tiles_cobrem_o_poligono():
+    geometria = serie_area.carregar_geojson(QUADRADO)
+    tiles = serie_area.dividir_em_tiles(geometria, 0.5)
+    assert len(tiles) == 4
+    assert min(t[0] for t in tiles) == -47.0 and max(t[3] for t in tiles) == -23.2
+
+
+def test_combinar_tiles_pondera_por_pixels():
+    a = pd.DataFrame({'ds': ['2024-01-01', '2024-01-02'], 'media': [1.0, 2.0], 'n': [10, 0]})
+    b = pd.DataFrame({'ds': ['2024-01-01'], 'media': [3.0], 'n': [30]})
+    df = serie_area._combinar_tiles([a, b, pd.DataFrame()], 'y')
+    assert list(df['ds']) == [pd.Timestamp('2024-01-01')]
+    assert df['y'].iloc[0] == 2.5
+
+
+def test_cache_expira_pelo_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(serie_area, 'PASTA_CACHE', str(tmp_path))
+    chamadas = []
+
+    def calcular():
+        chamadas.append(1)
+        return pd.DataFrame({'ds': pd.to_datetime(['2024-01-01']), 'y': [float(len(chamadas))]})
+
+    assert serie_area._com_cache('abc', 'NO2', calcular)['y'].iloc[0] == 1.0
+    assert serie_area._com_cache('abc', 'NO2', calcular)['y'].iloc[0] == 1.0
+    assert os.listdir(tmp_path) == ['abc_NO2.parquet']
+
+    os.utime(serie_area._caminho_cache('abc', 'NO2'), (0, 0))
+    assert serie_area._com_cache('abc', 'NO2', calcular)['y'].iloc[0] == 2.0